@@ -1,24 +1,175 @@
+import time
+STARTUP_STARTED = time.perf_counter()   # Measured first so startup phase timings include imports
 import discord
+import aiohttp
 import random
 import json
 import os
 import logging
-import time
 import re
 import asyncio
 import sys
-from gtts import gTTS
-from gtts.tokenizer import Tokenizer, pre_processors, tokenizer_cases
-from pydub import AudioSegment
+import heapq
+import math
+import queue
+import threading
+import atexit
+import signal
+import types
+import collections
+import contextlib
+import io
+from datetime import datetime
 from discord.ext import tasks, commands
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from functools import wraps
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
 from functools import partial
+import multiprocessing
+import paulbot_workers
+
+# Startup phase timing: each phase logs its own duration and the total time since the process started
+_last_startup_mark = STARTUP_STARTED
+
+def log_startup_phase(phase, now=None):
+    global _last_startup_mark
+    now = now if now is not None else time.perf_counter()
+    logging.info("Startup phase '%s' took %.1f ms (%.1f ms since start)", phase, (now - _last_startup_mark) * 1000, (now - STARTUP_STARTED) * 1000)
+    _last_startup_mark = now
+
+# Helpers to read optional numeric settings from the environment, falling back to defaults on bad input
+def get_env_int(name, default):
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logging.warning("Invalid integer for %s=%r; using default %s", name, value, default)
+        return default
+
+def get_env_float(name, default):
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning("Invalid number for %s=%r; using default %s", name, value, default)
+        return default
+
+# Token bucket used to rate limit !paul requests and sampled debug logging
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def consume(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self):
+        self._refill()
+        return self.tokens >= self.capacity
+
+    # Seconds until the next token is available (0 if one is available now)
+    def delay_until_available(self):
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+# Load environment variables from .env so logging settings are available before logging starts
+load_dotenv()
+
+# Counters for what logging costs: time spent handing records to the queue on the calling thread
+# (usually the event loop), time the background listener spends writing them, and records dropped
+class LoggingCosts:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enqueued = 0
+        self.enqueue_seconds = 0.0
+        self.written = 0
+        self.write_seconds = 0.0
+        self.dropped = 0        # queue was full
+        self.sampled_out = 0    # debug records over the sampling rate
+
+    def add(self, field, seconds_field=None, seconds=0.0):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if seconds_field:
+                setattr(self, seconds_field, getattr(self, seconds_field) + seconds)
+
+    # Return the counters since the last snapshot and reset them
+    def snapshot(self):
+        with self.lock:
+            values = {
+                "enqueued": self.enqueued,
+                "enqueue_seconds": self.enqueue_seconds,
+                "written": self.written,
+                "write_seconds": self.write_seconds,
+                "dropped": self.dropped,
+                "sampled_out": self.sampled_out,
+            }
+            self.enqueued = self.written = self.dropped = self.sampled_out = 0
+            self.enqueue_seconds = self.write_seconds = 0.0
+        return values
+
+logging_costs = LoggingCosts()
+
+# Queue handler that never blocks the caller: records are dropped (and counted) when the queue is full
+class TimedQueueHandler(QueueHandler):
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            logging_costs.add("dropped")
+
+    def emit(self, record):
+        started = time.perf_counter()
+        super().emit(record)
+        logging_costs.add("enqueued", "enqueue_seconds", time.perf_counter() - started)
+
+# Listener that writes queued records to the real handlers on a background thread and times the writes
+class TimedQueueListener(QueueListener):
+    def handle(self, record):
+        started = time.perf_counter()
+        super().handle(record)
+        if any(record.levelno >= handler.level for handler in self.handlers):     # Only count records a handler emitted
+            logging_costs.add("written", "write_seconds", time.perf_counter() - started)
+
+# Rate limit DEBUG records from chatty loggers; INFO and above always pass
+class DebugSampleFilter(logging.Filter):
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.bucket = TokenBucket(rate, burst)
+        self.lock = threading.Lock()    # voice logs also come from discord.py's audio player thread
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        with self.lock:
+            allowed = self.bucket.consume()
+        if not allowed:
+            logging_costs.add("sampled_out")
+        return allowed
+
+log_listener = None
 
 # Setup a logging function to process error handling throughout the script
 def setup_logging():
+    global log_listener
     # Load the desired log file path from environment variables (with a default fallback)
     log_file_path = os.getenv('LOG_FILE_PATH', '/app/logs/paulbot.log')
     log_level_str = os.getenv('LOG_LEVEL', 'INFO').upper()
@@ -38,40 +189,201 @@ def setup_logging():
             )
             log_file_path = fallback
 
+    # Debugging Discord voice issues: these loggers run at DEBUG, sampled down to DEBUG_LOG_RATE records per second each.
+    # Set DEBUG_LOGGERS to an empty value to turn this off.
+    debug_loggers = [name.strip() for name in os.getenv('DEBUG_LOGGERS', 'discord.voice_client,discord.voice_state,discord.gateway').split(',') if name.strip()]
+    debug_rate = get_env_float('DEBUG_LOG_RATE', 5.0)
+    debug_burst = get_env_int('DEBUG_LOG_BURST', 20)
+
+    # Every other logger is held at LOG_LEVEL by the root logger, so the handlers only need to go lower
+    # for the debug loggers' records; otherwise those would be queued and then thrown away by the listener.
+    handler_level = min(level, logging.DEBUG) if debug_loggers else level
+
     fmt = '%(asctime)s %(levelname)s %(name)s [%(process)d] %(message)s'
     datefmt = '%Y-%m-%d %H:%M:%S'
     formatter = logging.Formatter(fmt=fmt, datefmt=datefmt)
 
     file_handler = RotatingFileHandler(log_file_path, maxBytes=10_000_000, backupCount=5, encoding='utf-8')
     file_handler.setFormatter(formatter)
-    file_handler.setLevel(level)
+    file_handler.setLevel(handler_level)
 
     stream_handler = logging.StreamHandler(sys.stdout)  # stdout is for visibility in 'docker logs'
     stream_handler.setFormatter(formatter)
-    stream_handler.setLevel(level)
+    stream_handler.setLevel(handler_level)
+
+    # File and stdout writes (including rollover) happen on a background listener thread.
+    # The root logger only puts records on a queue, so logging never blocks the event loop on disk I/O.
+    log_queue = queue.Queue(maxsize=get_env_int('LOG_QUEUE_SIZE', 10_000))
+    queue_handler = TimedQueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))   # Only merges args into the message; the listener's handlers apply the real format
+    log_listener = TimedQueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)  # Flush queued records on exit
 
     # Force reconfigure root logger even if something configured it earlier
-    logging.basicConfig(level=level, handlers=[file_handler, stream_handler], force=True)
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
 
     # Set reasonable defaults for noisy libraries
     logging.getLogger('discord').setLevel(logging.INFO)
     logging.getLogger('websockets').setLevel(logging.WARNING)
 
-    # TEMPORARY: Debugging Discord voice issues
-    logging.getLogger('discord.voice_client').setLevel(logging.DEBUG)
-    logging.getLogger('discord.voice_state').setLevel(logging.DEBUG)
-    logging.getLogger('discord.gateway').setLevel(logging.DEBUG)
+    for name in debug_loggers:
+        debug_logger = logging.getLogger(name)
+        debug_logger.setLevel(logging.DEBUG)
+        if debug_rate > 0:
+            debug_logger.addFilter(DebugSampleFilter(debug_rate, debug_burst))
 
     logging.getLogger(__name__).info(
-        "Logging initialized level=%s file=%s (stdout + rotating file)",
-        log_level_str, log_file_path
+        "Logging initialized level=%s file=%s (stdout + rotating file via background queue); sampled debug loggers=%s at %s/s",
+        log_level_str, log_file_path, ','.join(debug_loggers) or 'none', debug_rate if debug_rate > 0 else 'unlimited'
     )
     
+# multiprocessing re-imports this script as '__mp_main__' in each audio worker it starts. The workers only
+# run paulbot_workers, so they skip the startup steps that open log files or touch the data files.
+IS_AUDIO_WORKER = __name__ == "__mp_main__"
+
 # Initialize logging
-setup_logging()
+_imports_finished = time.perf_counter()
+if not IS_AUDIO_WORKER:
+    setup_logging()
+    log_startup_phase("imports", _imports_finished)
+    log_startup_phase("logging")
+
+# Fast startup (the default) defers gTTS/pydub imports until the first voice playback and loads
+# quotes and stats in the background once the bot has logged in. Set FAST_STARTUP=0 to load eagerly.
+FAST_STARTUP = os.getenv('FAST_STARTUP', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+# Worker pools: each kind of blocking work gets its own pool, so a slow gTTS request can't hold up stats
+# writes or audio encoding. Each pool is created on first use and has a bounded queue; work submitted
+# while the queue is full is rejected with ExecutorFull instead of piling up behind a stalled pool.
+class ExecutorFull(RuntimeError):
+    pass
+
+class BoundedExecutor:
+    def __init__(self, name, factory, max_pending):
+        self.name = name
+        self.factory = factory
+        self.max_pending = max(1, max_pending)
+        self.executor = None
+        self.pending = 0    # jobs queued or running
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.completed = 0
+        self.rejected = 0
+        self.max_depth = self.pending
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.run_seconds = 0.0
+
+    # Queue func(*args) and return a future for its result; must be called on the event loop
+    def submit(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ExecutorFull(f"{self.name} pool queue is full ({self.pending} jobs pending)")
+        if self.executor is None:
+            self.executor = self.factory()
+
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+        submitted_at = time.time()
+        try:
+            job = asyncio.wrap_future(self.executor.submit(paulbot_workers.run_timed, func, args), loop=loop)
+        except BrokenExecutor:
+            self.restart()
+            raise
+        self.pending += 1
+        self.max_depth = max(self.max_depth, self.pending)
+        job.add_done_callback(partial(self._finished, submitted_at, result))
+        return result
+
+    async def run(self, func, *args):
+        return await self.submit(func, *args)
+
+    def _finished(self, submitted_at, result, job):
+        self.pending -= 1
+        if job.cancelled():
+            result.cancel()
+            return
+        error = job.exception()
+        if error is not None:
+            if isinstance(error, BrokenExecutor):
+                self.restart()
+            if not result.done():
+                result.set_exception(error)
+            return
 
-# Initialize ThreadPoolExecutor for offloading TTS work
-executor = ThreadPoolExecutor(max_workers=2)
+        started_at, ok, value = job.result()
+        wait = max(0.0, started_at - submitted_at)
+        self.completed += 1
+        self.wait_seconds += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.run_seconds += max(0.0, time.time() - started_at)
+        if result.done():
+            return      # The caller stopped waiting
+        if ok:
+            result.set_result(value)
+        else:
+            result.set_exception(value)
+
+    # A worker process died; drop the broken pool so the next job starts a fresh one
+    def restart(self):
+        logging.error("%s pool is broken (a worker died); it will be recreated on next use.", self.name)
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+
+    def shutdown(self, wait=True):
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait)
+            self.executor = None
+
+    def log_metrics(self, interval):
+        logging.info(
+            "%s pool over last %ss: %s jobs done, %s rejected (queue full), queue depth %s now / %s max (limit %s), "
+            "wait avg %.1f ms max %.1f ms, run avg %.1f ms",
+            self.name, int(interval), self.completed, self.rejected, self.pending, self.max_depth, self.max_pending,
+            self.wait_seconds / self.completed * 1000 if self.completed else 0.0, self.max_wait * 1000,
+            self.run_seconds / self.completed * 1000 if self.completed else 0.0
+        )
+        self.reset_metrics()
+
+# Audio workers are started by a fork server that has only imported paulbot_workers, so unlike a plain fork
+# of the bot they don't inherit its threads, Discord sockets or logging queue
+def make_audio_executor():
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    mp_context = multiprocessing.get_context(start_method)
+    if start_method == 'forkserver':
+        mp_context.set_forkserver_preload(['paulbot_workers'])
+    return ProcessPoolExecutor(
+        max_workers=max(1, get_env_int('AUDIO_WORKERS', 1)),
+        mp_context=mp_context,
+        initializer=paulbot_workers.init_audio_worker
+    )
+
+# Network-bound gTTS requests
+tts_pool = BoundedExecutor(
+    "TTS", lambda: ThreadPoolExecutor(max_workers=max(1, get_env_int('TTS_WORKERS', 2)), thread_name_prefix="tts"),
+    get_env_int('TTS_QUEUE_LIMIT', 4)
+)
+# CPU-bound MP3 decoding and encoding, in separate processes so it doesn't contend for the GIL
+audio_pool = BoundedExecutor("Audio", make_audio_executor, get_env_int('AUDIO_QUEUE_LIMIT', 4))
+# Disk I/O: file writes, loads and cleanup. One thread, so writes to a file land in the order they were made.
+io_pool = BoundedExecutor(
+    "Disk I/O", lambda: ThreadPoolExecutor(max_workers=1, thread_name_prefix="disk-io"),
+    get_env_int('IO_QUEUE_LIMIT', 32)
+)
+worker_pools = (tts_pool, audio_pool, io_pool)
+
+# Wait for queued work (e.g. file writes) to finish, then write anything still waiting for a retry; used on shutdown
+def shutdown_worker_pools():
+    for pool in worker_pools:
+        try:
+            pool.shutdown(wait=True)
+        except Exception:
+            logging.exception(f"Error shutting down {pool.name} pool.")
+    for path in list(pending_file_writes):
+        write_pending_file(path)
 
 # Function to handle file operations with error handling and logging
 def handle_file_operation(file_path, operation_func, *args, **kwargs):
@@ -95,12 +407,64 @@ def contains_url(text):
     url_pattern = re.compile(r'(https?://\S+|www\.\S+)')
     return url_pattern.search(text) is not None
 
-# Decorator for handling Discord-specific exceptions
+# Handler timing thresholds (seconds)
+HANDLER_SLOW_THRESHOLD = get_env_float('HANDLER_SLOW_THRESHOLD', 30.0)   # wall-clock time for a whole handler, including awaits
+LOOP_BLOCK_THRESHOLD = get_env_float('LOOP_BLOCK_THRESHOLD', 0.25)       # time a handler may run without yielding to the event loop
+
+# Tracks how long a coroutine ran on the event loop between awaits
+class StepTiming:
+    def __init__(self):
+        self.busy = 0.0         # total time spent running (not waiting)
+        self.longest = 0.0      # longest single stretch without yielding, i.e. how long it blocked the loop
+
+    def add(self, seconds):
+        self.busy += seconds
+        self.longest = max(self.longest, seconds)
+
+# Drive a coroutine step by step, timing each stretch it runs before yielding back to the event loop
+@types.coroutine
+def run_with_step_timing(coro, timing):
+    send_value, error = None, None
+    while True:
+        started = time.perf_counter()
+        try:
+            yielded = coro.send(send_value) if error is None else coro.throw(error)
+        except StopIteration as stop:
+            timing.add(time.perf_counter() - started)
+            return stop.value
+        except BaseException:
+            timing.add(time.perf_counter() - started)
+            raise
+        timing.add(time.perf_counter() - started)
+        try:
+            send_value, error = (yield yielded), None
+        except GeneratorExit:
+            coro.close()
+            raise
+        except BaseException as e:  # Includes CancelledError, which must reach the coroutine
+            send_value, error = None, e
+
+# Log handlers that ran too long or held the event loop too long
+def report_handler_timing(name, elapsed, timing):
+    if timing.longest > LOOP_BLOCK_THRESHOLD:
+        logging.warning("%s blocked the event loop for %.0f ms without yielding (%.0f ms busy, %.0f ms total).", name, timing.longest * 1000, timing.busy * 1000, elapsed * 1000)
+    elif elapsed > HANDLER_SLOW_THRESHOLD:
+        logging.warning("%s took %.1f s (%.0f ms busy on the event loop).", name, elapsed, timing.busy * 1000)
+    else:
+        logging.debug("%s took %.1f ms (%.1f ms busy, longest step %.1f ms).", name, elapsed * 1000, timing.busy * 1000, timing.longest * 1000)
+
+# Decorator for handling Discord-specific exceptions and timing every event handler, command and background task
 def discord_exception_handler(func):
     @wraps(func)
     async def wrapper(*args, **kwargs):
+        name = func.__name__
+        command = getattr(args[0], 'content', '') if args else ''
+        if isinstance(command, str) and command.startswith('!'):
+            name = f"{name} ({command.split()[0][:32]})"    # Label on_message timings with the command
+        timing = StepTiming()
+        started = time.perf_counter()
         try:
-            return await func(*args, **kwargs)
+            return await run_with_step_timing(func(*args, **kwargs), timing)
         except discord.HTTPException as e:
             logging.exception(f"HTTPException in {func.__name__}: {e}")
         except discord.Forbidden as e:
@@ -109,10 +473,91 @@ def discord_exception_handler(func):
             logging.exception(f"NotFound in {func.__name__}: {e}")
         except Exception as e:
             logging.exception(f"Unexpected error in {func.__name__}: {e}")
+        finally:
+            report_handler_timing(name, time.perf_counter() - started, timing)
     return wrapper
 
-# Load environment variables for Discord token
-load_dotenv()
+# Watch for event loop stalls: a sleep that wakes up late means something held the loop
+LOOP_LAG_CHECK_INTERVAL = get_env_float('LOOP_LAG_CHECK_INTERVAL', 0.5)
+
+async def monitor_event_loop_lag():
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(LOOP_LAG_CHECK_INTERVAL)
+        lag = loop.time() - started - LOOP_LAG_CHECK_INTERVAL
+        if lag > LOOP_BLOCK_THRESHOLD:
+            logging.warning("Event loop lagged %.0f ms behind schedule; something blocked it.", lag * 1000)
+
+# Sampling profiler: a background thread records every thread's stack at a fixed interval and writes
+# them in collapsed-stack format ("thread;outer;...;inner count"), readable by flamegraph.pl or speedscope
+PROFILE_SAMPLE_INTERVAL = get_env_float('PROFILE_SAMPLE_INTERVAL', 0.005)
+PROFILE_MAX_SECONDS = get_env_int('PROFILE_MAX_SECONDS', 300)
+PROFILE_DIR = os.getenv('PROFILE_DIR') or os.path.dirname(os.getenv('LOG_FILE_PATH', '/app/logs/paulbot.log')) or '.'
+
+class SamplingProfiler(threading.Thread):
+    def __init__(self, duration, path):
+        super().__init__(name='paulbot-profiler', daemon=True)
+        self.duration = duration
+        self.path = path
+        self.samples = 0
+        self.error = None
+
+    def run(self):
+        stacks = collections.Counter()
+        thread_names = {}
+        deadline = time.monotonic() + self.duration
+        try:
+            while time.monotonic() < deadline:
+                for thread in threading.enumerate():
+                    thread_names[thread.ident] = thread.name
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == self.ident:
+                        continue
+                    frames = []
+                    while frame is not None:
+                        code = frame.f_code
+                        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    frames.append(thread_names.get(thread_id, str(thread_id)))
+                    stacks[';'.join(reversed(frames))] += 1
+                self.samples += 1
+                time.sleep(PROFILE_SAMPLE_INTERVAL)
+
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.path, 'w', encoding='utf-8') as file:
+                for stack, count in stacks.most_common():
+                    file.write(f"{stack} {count}\n")
+        except Exception as e:
+            self.error = e
+            logging.exception(f"Sampling profiler failed writing '{self.path}'. Error: {e}")
+
+active_profiler = None
+
+# Run the sampling profiler in the background and report where the profile was written.
+# Not wrapped in discord_exception_handler: it runs for the requested duration on purpose, which would be
+# reported as a slow handler.
+async def record_profile(channel, duration):
+    global active_profiler
+    try:
+        path = os.path.join(PROFILE_DIR, f"paulbot-profile-{datetime.now():%Y%m%d-%H%M%S}.folded")
+        profiler = active_profiler = SamplingProfiler(duration, path)
+        profiler.start()
+        await asyncio.to_thread(profiler.join)
+        if profiler.error is None:
+            logging.info("Sampling profiler wrote %s samples to %s", profiler.samples, path)
+            await channel.send(f"Profile written to `{path}` ({profiler.samples} samples).")
+        else:
+            await channel.send('Profiling failed; see the log for details.')
+    except Exception as e:
+        logging.exception(f"Unexpected error recording a {duration}s profile. Error: {e}.")
+
+# Only server administrators may run admin commands
+def is_admin(member):
+    permissions = getattr(member, 'guild_permissions', None)
+    return bool(permissions and permissions.administrator)
+
+# Environment variables for Discord token (loaded from .env before logging is set up)
 TOKEN = os.getenv('DISCORD_TOKEN')
 GUILD_ID = os.getenv('DISCORD_GUILD_ID')
 VOICE_CHANNEL_ID = os.getenv('VOICE_CHANNEL_ID')
@@ -136,7 +581,8 @@ intents = discord.Intents.all()
 #intents.reactions = True # Enable reaction events
 #intents.guilds = True # Enable server data so the bot can join voice chat
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Reactions are tracked from raw gateway events, so the message cache only needs to cover recent messages
+bot = commands.Bot(command_prefix='!', intents=intents, max_messages=get_env_int('MESSAGE_CACHE_SIZE', 100))
 
 # Set global voice fails to support reconnects for stale voice sessions
 VOICE_FAIL_COUNT = 0
@@ -153,6 +599,41 @@ _next_connect_allowed_ts = 0.0
 CONNECT_COOLDOWN = 20   # seconds between attempts; normal cooldown
 SICK_BACKOFF = 90   # when Discord returns 4006 or empty modes
 
+# Rate limiting for !paul bursts. Buckets refill RATE tokens per second up to BURST tokens.
+# A rate of 0 disables that limiter. Throttled requests are merged into a single reply per channel.
+PAUL_USER_RATE = get_env_float('PAUL_USER_RATE', 0.2)          # one quote every 5s per user once the burst is spent
+PAUL_USER_BURST = get_env_int('PAUL_USER_BURST', 3)
+PAUL_CHANNEL_RATE = get_env_float('PAUL_CHANNEL_RATE', 1.0)    # stays under Discord's 5 messages / 5s per channel
+PAUL_CHANNEL_BURST = get_env_int('PAUL_CHANNEL_BURST', 5)
+PAUL_COALESCE_WINDOW = get_env_float('PAUL_COALESCE_WINDOW', 2.0)  # seconds to collect throttled requests before replying
+PAUL_COALESCE_MAX = get_env_int('PAUL_COALESCE_MAX', 5)            # most quotes merged into one reply; extras are dropped
+STATS_SAVE_DELAY = get_env_float('STATS_SAVE_DELAY', 5.0)          # seconds to batch stats changes before writing stats.json
+DISCORD_MESSAGE_LIMIT = 2000
+SEARCH_RESULT_LIMIT = get_env_int('SEARCH_RESULT_LIMIT', 5)  # most quotes returned by !search
+IMPORT_MAX_BYTES = get_env_int('IMPORT_MAX_BYTES', 5_000_000)  # largest attachment accepted by !importquotes
+
+paul_user_buckets = {}      # user id -> TokenBucket
+paul_channel_buckets = {}   # channel id -> TokenBucket
+pending_paul_replies = {}   # channel id -> IDs of quotes waiting to be sent as one merged reply
+paul_flush_tasks = {}       # channel id -> task that sends the merged reply
+MAX_TRACKED_BUCKETS = 1000
+
+# Helper to fetch (or create) the bucket for a key; returns None when the limiter is disabled
+def get_bucket(buckets, key, rate, burst):
+    if rate <= 0:
+        return None
+    bucket = buckets.get(key)
+    if bucket is None:
+        if len(buckets) >= MAX_TRACKED_BUCKETS:
+            # Forget idle buckets; a full bucket behaves exactly like a new one
+            for idle_key in [k for k, b in buckets.items() if b.is_full()]:
+                del buckets[idle_key]
+        bucket = buckets[key] = TokenBucket(rate, burst)
+    return bucket
+
+# stats.json layout version: 1 keyed quote_reactions by quote text, 2 keys reactions and uses by quote ID
+STATS_VERSION = 2
+
 # Define permanent file storage for persistent quote storage and statistics
 quotes_file = 'quotes.json'  # File to store quotes
 stats_file = 'stats.json'   # File to store stats
@@ -162,39 +643,548 @@ def load_json_file(path):
     with open(path, 'r') as file:
         return json.load(file)
     
-def save_json_file(path, data):
+def write_text_file(path, text):
     with open(path, 'w') as file:
-        json.dump(data, file, indent=4)
+        file.write(text)
+
+# Format quotes.json with one {"id", "quote"} record per line, so it stays diff-friendly and streamable
+def format_quote_records(records):
+    lines = ",\n".join(f"    {json.dumps({'id': quote_id, 'quote': quote})}" for quote_id, quote in records)
+    return f"[\n{lines}\n]\n" if records else "[]\n"
+
+# Write a file atomically (temp file, fsync, rename): readers see the old or the new content, never a partial write.
+# Only for files the bot owns outright; the single-file bind mounts of quotes.json and stats.json must be
+# rewritten in place, since renaming over a bind-mounted file fails.
+def write_file_atomically(path, text):
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as file:
+        file.write(text)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+# Identifies a version of a file on disk, to notice when it's changed by something other than the bot
+def file_signature(path):
+    try:
+        file_stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (file_stat.st_mtime_ns, file_stat.st_ino, file_stat.st_size)
+
+known_file_signatures = {}  # path -> signature of the version the bot last wrote or read
+
+# File writes happen on the disk I/O pool. The caller serializes the data on the event loop, so the write
+# sees a consistent snapshot; a write that hasn't started yet is superseded by a newer one for the same file.
+pending_file_writes = {}    # path -> newest text waiting to be written
+pending_file_writes_lock = threading.Lock()
+file_write_lock = threading.Lock()  # one write at a time, so an older snapshot can't land after a newer one
+
+def write_pending_file(path):
+    with file_write_lock:
+        with pending_file_writes_lock:
+            text = pending_file_writes.pop(path, None)
+        if text is None:
+            return      # Already written by an earlier job
+        try:
+            handle_file_operation(path, write_text_file, text)
+            known_file_signatures[path] = file_signature(path)  # Our own write isn't an outside edit
+        except Exception as e:
+            logging.exception(f"Unexpected error writing '{path}'. Error: {e}.")
+
+def write_file_in_background(path, text):
+    with pending_file_writes_lock:
+        already_queued = path in pending_file_writes
+        pending_file_writes[path] = text
+    if already_queued:
+        return      # The queued job will write this newer text
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        write_pending_file(path)    # No event loop (startup or shutdown); write immediately
+        return
+    submit_pending_file_write(path)
+
+# Queue the write of a file's pending text. If the disk I/O queue is full, try again shortly rather than
+# writing on the event loop; the text stays pending, so the retry writes whatever is newest by then.
+def submit_pending_file_write(path):
+    try:
+        io_pool.submit(write_pending_file, path)
+    except ExecutorFull as e:
+        logging.warning(f"{e}; retrying the write of '{path}' in 1s.")
+        asyncio.get_running_loop().call_later(1, submit_pending_file_write, path)
 
 # Load existing quotes from file
 def load_quotes():
+    known_file_signatures[quotes_file] = file_signature(quotes_file)   # Taken before reading, so a change mid-read is seen later
     return handle_file_operation(quotes_file, load_json_file) or []
 
 # Save quotes to file
-def save_quotes(quotes):
-    handle_file_operation(quotes_file, save_json_file, quotes)
+def save_quotes():
+    write_file_in_background(quotes_file, format_quote_records(list(zip(quote_ids, quotes))))
         
 # Load existing stats from file
 def load_stats():
-    default_stats = {"paul_commands": {}, "quote_reactions": {}}
+    default_stats = {"paul_commands": {}, "quote_reactions": {}, "quote_uses": {}, "stats_version": STATS_VERSION}
     return handle_file_operation(stats_file, load_json_file) or default_stats
     
 # Save stats to file
 def save_stats (stats):
-    handle_file_operation(stats_file, save_json_file, stats)
+    write_file_in_background(stats_file, json.dumps(stats, indent=4))
+
+# Batch stats writes: changes made within STATS_SAVE_DELAY seconds are written to stats.json once
+_stats_save_handle = None
+
+def schedule_stats_save():
+    global _stats_save_handle
+    if _stats_save_handle is not None:
+        return      # A save is already scheduled and will include this change
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        save_stats(stats)   # No event loop (e.g. during shutdown); write immediately
+        return
+    _stats_save_handle = loop.call_later(STATS_SAVE_DELAY, flush_stats)
+
+# Write any pending stats changes now
+def flush_stats():
+    global _stats_save_handle
+    if _stats_save_handle is None:
+        return
+    _stats_save_handle.cancel()
+    _stats_save_handle = None
+    save_stats(stats)
+    save_quote_messages()
 
 # Add a new quote
 def add_quote(quote):
     try:
-        quotes.append(quote)
-        save_quotes(quotes)
+        register_quote(allocate_quote_id(), quote)
+        save_quotes()
     except AttributeError as e:
         logging.exception(f"AttributeError: Failed to add quote '{quote}' to '{quotes_file}'. Error: {e}.")
     except Exception as e:
         logging.exception(f"Unexpected error adding quote '{quote}' to '{quotes_file}'. Error: {e}")
 
-quotes = load_quotes()  # Load existing quotes from file
-stats = load_stats()    # Load existing stats from file
+# Split text into lowercase search terms; apostrophes are dropped so "don't" matches "dont"
+def tokenize_for_search(text):
+    return re.findall(r"\w+", text.lower().replace("'", "").replace("\u2019", ""))
+
+# In-memory inverted index over quotes (search term -> posting list of quote IDs) used by !search
+class QuoteIndex:
+    def __init__(self):
+        self.postings = {}  # term -> {quote ID: occurrences of the term in that quote}
+        self.lengths = {}   # quote ID -> number of terms in the quote
+
+    def add(self, quote_id, text):
+        terms = tokenize_for_search(text)
+        self.lengths[quote_id] = len(terms)
+        for term in terms:
+            posting = self.postings.setdefault(term, {})
+            posting[quote_id] = posting.get(quote_id, 0) + 1
+
+    def remove(self, quote_id, text):
+        self.lengths.pop(quote_id, None)
+        for term in set(tokenize_for_search(text)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            posting.pop(quote_id, None)
+            if not posting:
+                del self.postings[term]
+
+    # Ranked AND search: only quotes containing every term are returned, best matches first
+    def search(self, query, limit=SEARCH_RESULT_LIMIT):
+        terms = set(tokenize_for_search(query))
+        if not terms:
+            return []
+        postings = [self.postings.get(term) for term in terms]
+        if not all(postings):
+            return []   # A term that appears nowhere means nothing can match all terms
+
+        # Walk the shortest posting list and probe the others, so cost tracks the rarest term
+        postings.sort(key=len)
+        candidates = [quote_id for quote_id in postings[0] if all(quote_id in posting for posting in postings[1:])]
+
+        # Score with TF-IDF, normalized by quote length so short, focused quotes rank above long ones
+        total = len(self.lengths)
+        weights = [math.log(1 + total / len(posting)) for posting in postings]
+
+        def score(quote_id):
+            raw = sum(posting[quote_id] * weight for posting, weight in zip(postings, weights))
+            return raw / math.sqrt(self.lengths.get(quote_id, 1) or 1)
+
+        return heapq.nlargest(limit, candidates, key=score)
+
+# Add many quotes at once: the search index is updated in one pass and quotes.json is written once
+def add_quotes(new_quotes):
+    try:
+        for quote in new_quotes:
+            register_quote(allocate_quote_id(), quote)
+        save_quotes()
+    except Exception as e:
+        logging.exception(f"Unexpected error adding {len(new_quotes)} quotes to '{quotes_file}'. Error: {e}")
+        raise
+
+# Key used to detect duplicate quotes, ignoring case and whitespace differences
+def quote_dedupe_key(quote):
+    return ' '.join(quote.split()).casefold()
+
+# Parse one line of an import file into quotes.
+# JSON mode accepts JSON lines (a string, or an object with a "quote" or "text" field) as well as
+# quotes.json itself, which is written one record per line inside a JSON array.
+def parse_import_line(line, json_mode):
+    text = line.strip()
+    if not json_mode:
+        return [text] if text else []
+    text = text.rstrip(',')
+    if text in ('', '[', ']', '[]'):
+        return []
+    value = json.loads(text)
+    values = value if isinstance(value, list) else [value]
+    parsed = []
+    for item in values:
+        if isinstance(item, dict):
+            item = item.get("quote", item.get("text"))
+        if not isinstance(item, str):
+            raise ValueError(f"Expected a quote string, got {type(item).__name__}")
+        if item.strip():
+            parsed.append(item.strip())
+    return parsed
+
+# Stream an attachment line by line instead of reading the whole file into memory
+async def stream_attachment_lines(attachment):
+    async with aiohttp.ClientSession() as session:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+            async for raw_line in response.content:
+                yield raw_line.decode('utf-8', errors='replace').lstrip('\ufeff')
+
+# Every quote has a stable integer ID stored alongside it in quotes.json. Stats and the search index
+# refer to quotes by ID, so editing a quote's text keeps its stats.
+quotes = []             # Quote texts, in quotes.json order
+quote_ids = []          # ID of each entry in quotes
+quotes_by_id = {}       # quote ID -> text
+quote_id_by_text = {}   # text -> quote ID
+next_quote_id = 0
+stats = {"paul_commands": {}, "quote_reactions": {}, "quote_uses": {}, "stats_version": STATS_VERSION}   # Stats from stats.json
+quote_index = QuoteIndex()  # Search index over the loaded quotes
+data_loaded = asyncio.Event()   # Set once quotes and stats are loaded; handlers wait on it
+
+def allocate_quote_id():
+    global next_quote_id
+    quote_id = next_quote_id
+    next_quote_id += 1
+    stats["next_quote_id"] = next_quote_id     # High-water mark: IDs of deleted quotes are never handed out again
+    schedule_stats_save()
+    return quote_id
+
+# Add a quote to the in-memory lookups and search index (does not save)
+def register_quote(quote_id, quote):
+    global next_quote_id
+    quotes.append(quote)
+    quote_ids.append(quote_id)
+    quotes_by_id[quote_id] = quote
+    quote_id_by_text.setdefault(quote, quote_id)
+    quote_index.add(quote_id, quote)
+    next_quote_id = max(next_quote_id, quote_id + 1)
+
+# Turn the contents of quotes.json into (ID, text) pairs. Entries are {"id": n, "quote": text}; plain strings
+# (older files or hand edits) and entries with a missing or duplicate ID get the next free ID.
+# Assigned IDs start at first_free_id or above. Returns the pairs and whether any ID had to be assigned.
+def normalize_quote_records(entries, first_free_id=0):
+    records = []
+    used_ids = set()
+    for entry in entries:
+        quote_id, quote = (entry.get("id"), entry.get("quote")) if isinstance(entry, dict) else (None, entry)
+        if not isinstance(quote, str) or not quote.strip():
+            logging.warning("Skipping invalid entry in '%s': %r", quotes_file, entry)
+            continue
+        if type(quote_id) is not int or quote_id < 0 or quote_id in used_ids:
+            quote_id = None
+        else:
+            used_ids.add(quote_id)
+        records.append([quote_id, quote])
+
+    next_id = max(max(used_ids, default=-1) + 1, first_free_id)
+    assigned = False
+    for record in records:
+        if record[0] is None:
+            record[0] = next_id
+            next_id += 1
+            assigned = True
+    return [tuple(record) for record in records], assigned
+
+# Convert stats to the ID-keyed layout. Version 1 keyed quote_reactions by quote text and repeated the
+# text as "content"; those entries are matched to quote IDs, and any whose quote no longer exists are
+# kept under orphaned_quote_reactions. Returns True if the stats changed.
+def migrate_stats(loaded_stats):
+    loaded_stats.setdefault("paul_commands", {})
+    reactions = loaded_stats.get("quote_reactions", {})
+    changed = False
+
+    if loaded_stats.get("stats_version", 1) < 2:
+        ids_by_key = {quote_dedupe_key(quote): quote_id for quote_id, quote in quotes_by_id.items()}
+        migrated = {}
+        orphaned = loaded_stats.get("orphaned_quote_reactions", {})
+        for text, entry in reactions.items():
+            count = entry.get("reactions", 0) if isinstance(entry, dict) else entry
+            content = entry.get("content", text) if isinstance(entry, dict) else text
+            quote_id = quote_id_by_text.get(content, ids_by_key.get(quote_dedupe_key(content)))
+            if quote_id is None:
+                orphaned[content] = orphaned.get(content, 0) + count
+            else:
+                migrated[quote_id] = migrated.get(quote_id, 0) + count
+        if orphaned:
+            loaded_stats["orphaned_quote_reactions"] = orphaned
+        logging.info("Migrated stats to quote IDs: %s quotes with reactions, %s reaction entries without a matching quote.", len(migrated), len(orphaned))
+        reactions = migrated
+        loaded_stats["stats_version"] = STATS_VERSION
+        changed = True
+
+    # JSON object keys are strings; counters are keyed by integer quote ID in memory
+    loaded_stats["quote_reactions"] = {int(quote_id): count for quote_id, count in reactions.items()}
+    loaded_stats["quote_uses"] = {int(quote_id): count for quote_id, count in loaded_stats.get("quote_uses", {}).items()}
+    return changed
+
+# Replace the in-memory quotes, stats and search index with freshly loaded data
+def apply_loaded_data(loaded_quotes, loaded_stats, loaded_quote_messages=None):
+    global quote_index, next_quote_id
+    # stats.json records the next unused ID, so a deleted quote's ID (and its stats) can't pass to a new quote
+    high_water_mark = loaded_stats.get("next_quote_id")
+    high_water_mark = high_water_mark if type(high_water_mark) is int else 0
+    # Files written before the mark existed: stay above every ID that still has counters
+    if loaded_stats.get("stats_version", 1) >= 2:
+        for counts in (loaded_stats.get("quote_reactions", {}), loaded_stats.get("quote_uses", {})):
+            high_water_mark = max([high_water_mark] + [int(quote_id) + 1 for quote_id in counts if str(quote_id).isdigit()])
+    records, ids_assigned = normalize_quote_records(loaded_quotes, high_water_mark)
+    quotes.clear()
+    quote_ids.clear()
+    quotes_by_id.clear()
+    quote_id_by_text.clear()
+    quote_index = QuoteIndex()
+    next_quote_id = 0
+    for quote_id, quote in records:
+        register_quote(quote_id, quote)
+    next_quote_id = max(next_quote_id, high_water_mark)
+
+    stats_migrated = migrate_stats(loaded_stats)
+    # Earlier versions kept the message lookup in stats.json; it now has its own file
+    legacy_quote_messages = loaded_stats.pop("quote_messages", None)
+    if legacy_quote_messages is not None:
+        stats_migrated = True
+    stats.clear()
+    stats.update(loaded_stats)
+    apply_quote_messages(loaded_quote_messages or [], legacy_quote_messages or {})
+
+    # Drop counters for quotes deleted while the bot was down. Skipped when no quotes loaded, since that
+    # usually means quotes.json couldn't be read rather than that every quote was deleted.
+    if quotes_by_id:
+        pruned = 0
+        for counts in (stats["quote_reactions"], stats["quote_uses"]):
+            for quote_id in counts.keys() - quotes_by_id.keys():
+                del counts[quote_id]
+                pruned += 1
+        if pruned:
+            logging.info("Dropped %s stats entries for quotes no longer in '%s'.", pruned, quotes_file)
+            stats_migrated = True
+    if stats.get("next_quote_id") != next_quote_id:
+        stats["next_quote_id"] = next_quote_id
+        stats_migrated = True
+
+    # Persist newly assigned IDs before any stats keyed by them are written
+    if ids_assigned:
+        logging.info("Assigned IDs to quotes without one; rewriting '%s'.", quotes_file)
+        save_quotes()
+    if stats_migrated:
+        save_stats(stats)
+
+    data_loaded.set()
+    logging.info("Loaded %s quotes and stats for %s users.", len(quotes), len(stats.get("paul_commands", {})))
+
+# Apply an edited quotes.json without a restart. Only quotes that were added, removed or changed are
+# re-indexed, IDs keep their stats (so fixing a typo keeps a quote's reactions), and stats for removed quotes are dropped.
+def apply_quote_file_changes(entries):
+    global next_quote_id
+    records, ids_assigned = normalize_quote_records(entries, next_quote_id)
+    new_quotes = dict(records)
+    removed = [quote_id for quote_id in quotes_by_id if quote_id not in new_quotes]
+    added = [quote_id for quote_id in new_quotes if quote_id not in quotes_by_id]
+    changed = [quote_id for quote_id in new_quotes if quote_id in quotes_by_id and quotes_by_id[quote_id] != new_quotes[quote_id]]
+    if not (removed or added or changed or ids_assigned) and [quote_id for quote_id, _ in records] == quote_ids:
+        return
+
+    for quote_id in removed + changed:
+        quote_index.remove(quote_id, quotes_by_id[quote_id])
+    for quote_id in added + changed:
+        quote_index.add(quote_id, new_quotes[quote_id])
+
+    # The lists and lookups are cheap to rebuild and must follow the file's order
+    quotes[:] = [quote for _, quote in records]
+    quote_ids[:] = [quote_id for quote_id, _ in records]
+    quotes_by_id.clear()
+    quotes_by_id.update(new_quotes)
+    quote_id_by_text.clear()
+    for quote_id, quote in records:
+        quote_id_by_text.setdefault(quote, quote_id)
+    next_quote_id = max(next_quote_id, max(quote_ids, default=-1) + 1)
+    if stats.get("next_quote_id") != next_quote_id:
+        stats["next_quote_id"] = next_quote_id
+        schedule_stats_save()
+
+    if removed:
+        removed_ids = set(removed)
+        for counts in (stats["quote_reactions"], stats["quote_uses"]):
+            for quote_id in removed_ids & counts.keys():
+                del counts[quote_id]
+        for message_id in [message_id for message_id, quote_id in quote_messages.items() if quote_id in removed_ids]:
+            del quote_messages[message_id]  # Left in the lookup file until it's next compacted
+        schedule_stats_save()
+    if ids_assigned:
+        save_quotes()   # Persist the IDs given to hand-added quotes
+
+    logging.info("Reloaded '%s': %s quotes added, %s removed, %s changed; %s quotes loaded.", quotes_file, len(added), len(removed), len(changed), len(quotes))
+
+# Read quotes.json if something other than the bot changed it since the bot last wrote or read it; returns
+# None when unchanged. Runs on the disk I/O pool, so it can't overlap one of the bot's own writes.
+def read_changed_quotes():
+    with file_write_lock:
+        signature = file_signature(quotes_file)
+        if signature is None or signature == known_file_signatures.get(quotes_file):
+            return None
+        if quotes_file in pending_file_writes:
+            return None     # The bot is about to rewrite the file; its in-memory quotes are newer
+        known_file_signatures[quotes_file] = signature  # Recorded first, so a broken file is reported once
+        try:
+            return load_json_file(quotes_file)
+        except json.JSONDecodeError as e:
+            logging.warning(f"JSONDecodeError: '{quotes_file}' changed but isn't valid JSON (maybe mid-edit); keeping the loaded quotes. Error: {e}.")
+            return None
+
+# Count a quote being sent or spoken
+def record_quote_use(quote_id):
+    if quote_id not in quotes_by_id:
+        return      # Removed from quotes.json while it was being played
+    stats["quote_uses"][quote_id] = stats["quote_uses"].get(quote_id, 0) + 1
+    schedule_stats_save()
+
+# Remember which quote a PaulBot message holds, so reactions to it can be counted without fetching it.
+# The lookup keeps the newest QUOTE_MESSAGE_LIMIT messages. It's bot-internal state, so it lives in its own
+# file rather than stats.json (which is synced to git): one "message_id quote_id" line per message, appended
+# as messages are sent, with later lines winning. The file is compacted when it loads and when it grows too long.
+QUOTE_MESSAGE_LIMIT = get_env_int('QUOTE_MESSAGE_LIMIT', 20_000)
+quote_messages_file = os.getenv('QUOTE_MESSAGES_FILE', 'data/quote_messages.txt')
+
+quote_messages = {}         # message ID -> quote ID
+quote_message_heap = []     # message IDs, smallest (oldest) first, for eviction; may hold IDs already dropped
+pending_quote_message_lines = []    # lines not yet appended to the lookup file
+quote_message_file_lines = 0        # lines in the lookup file, to know when to compact it
+
+def load_quote_messages():
+    try:
+        with open(quote_messages_file, 'r') as file:
+            return file.readlines()
+    except FileNotFoundError:
+        return []
+
+# Rebuild the lookup from the file's lines (plus entries migrated from stats.json), keeping only known quotes
+def apply_quote_messages(lines, legacy_entries):
+    global quote_message_file_lines
+    loaded = {int(message_id): quote_id for message_id, quote_id in legacy_entries.items()}
+    for line in lines:
+        try:
+            message_id, quote_id = map(int, line.split())
+        except ValueError:
+            continue    # A line cut short by a crash mid-append
+        loaded[message_id] = quote_id
+
+    newest = heapq.nlargest(QUOTE_MESSAGE_LIMIT, (message_id for message_id, quote_id in loaded.items() if quote_id in quotes_by_id))
+    quote_messages.clear()
+    quote_messages.update((message_id, loaded[message_id]) for message_id in newest)
+    quote_message_heap[:] = newest
+    heapq.heapify(quote_message_heap)
+    pending_quote_message_lines.clear()
+    quote_message_file_lines = len(lines)
+    if len(lines) != len(quote_messages):
+        compact_quote_messages()
+
+def remember_quote_message(message_id, quote_id):
+    if message_id not in quote_messages:
+        heapq.heappush(quote_message_heap, message_id)
+    quote_messages[message_id] = quote_id
+    while len(quote_messages) > QUOTE_MESSAGE_LIMIT:
+        quote_messages.pop(heapq.heappop(quote_message_heap), None)     # Discord message IDs grow over time, so the smallest is the oldest
+    pending_quote_message_lines.append(f"{message_id} {quote_id}\n")
+    schedule_stats_save()   # Appended with the next batched stats write
+
+def write_quote_messages(text, mode):
+    try:
+        os.makedirs(os.path.dirname(quote_messages_file) or '.', exist_ok=True)
+        if mode == 'w':
+            write_file_atomically(quote_messages_file, text)
+        else:
+            with open(quote_messages_file, 'a') as file:
+                file.write(text)
+    except Exception as e:
+        logging.exception(f"Unexpected error writing '{quote_messages_file}'. Error: {e}.")
+
+# Run a lookup file write on the disk I/O pool (in order with earlier ones), or inline without an event loop.
+# If the I/O queue is full, try again shortly; entries never change once written, so order doesn't matter.
+def submit_quote_messages_write(text, mode):
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        write_quote_messages(text, mode)    # No event loop (startup or shutdown)
+        return
+    try:
+        io_pool.submit(write_quote_messages, text, mode)
+    except ExecutorFull as e:
+        logging.warning(f"{e}; retrying the write of '{quote_messages_file}' in 1s.")
+        loop.call_later(1, submit_quote_messages_write, text, mode)
+
+def compact_quote_messages():
+    global quote_message_file_lines
+    pending_quote_message_lines.clear()
+    quote_message_file_lines = len(quote_messages)
+    submit_quote_messages_write("".join(f"{message_id} {quote_id}\n" for message_id, quote_id in quote_messages.items()), 'w')
+
+# Append newly remembered messages to the lookup file, compacting it instead once it's twice the limit
+def save_quote_messages():
+    global quote_message_file_lines
+    if not pending_quote_message_lines:
+        return
+    if quote_message_file_lines + len(pending_quote_message_lines) > 2 * max(QUOTE_MESSAGE_LIMIT, len(quote_messages)):
+        compact_quote_messages()
+        return
+    quote_message_file_lines += len(pending_quote_message_lines)
+    text = "".join(pending_quote_message_lines)
+    pending_quote_message_lines.clear()
+    submit_quote_messages_write(text, 'a')
+
+# Find the quote a PaulBot message contains (first match in quotes.json order), or None
+def find_quote_in_message(content):
+    content = content.lower()
+    for quote_id, quote in zip(quote_ids, quotes):
+        if quote.lower() in content:
+            return quote_id
+    return None
+
+# Load quotes and stats off the event loop so the gateway connection isn't held up by file parsing
+@discord_exception_handler
+async def load_data():
+    try:
+        loaded_quotes = await io_pool.run(load_quotes)
+        loaded_stats = await io_pool.run(load_stats)
+        loaded_quote_messages = await io_pool.run(load_quote_messages)
+        apply_loaded_data(loaded_quotes, loaded_stats, loaded_quote_messages)
+    except Exception:
+        logging.exception("Unexpected error loading quotes and stats; continuing with empty data.")
+        data_loaded.set()
+    log_startup_phase("data load")
+
+if not FAST_STARTUP and not IS_AUDIO_WORKER:
+    apply_loaded_data(load_quotes(), load_stats(), load_quote_messages())  # Load existing quotes and stats from file
+    log_startup_phase("data load")
 
 # Fetch previous content for statistics
 @discord_exception_handler    
@@ -211,7 +1201,7 @@ async def fetch_message_stats(channel):
             user_id = str(message.author.id)
             try:
                 stats["paul_commands"][user_id] = stats["paul_commands"].get(user_id, 0) + 1
-                save_stats(stats)   # Save updated stats here
+                schedule_stats_save()   # Batched; the whole fetch is saved once at the end
             except KeyError as e:
                 logging.exception(f"KeyError updating paul_commands for user: {user_id} during !fetch process. Error: {e}")
             except OSError as e:
@@ -222,18 +1212,18 @@ async def fetch_message_stats(channel):
             
         # Track reactions to quotes
         if message.author == bot.user:
-            for quote in quotes:
+            matched_quote_id = find_quote_in_message(content)
+            if matched_quote_id is not None:
+                remember_quote_message(message.id, matched_quote_id)
+            for quote_id, quote in zip(quote_ids, quotes):
                 if quote.lower() in content:
                     try:    
                         # Check if the message has reactions
                         reactions_count = sum(reaction.count for reaction in message.reactions)
                         if reactions_count > 0:
                             # Aggregate reactions for each occurrence of the quote
-                            if quote in stats["quote_reactions"]:
-                                stats["quote_reactions"][quote]["reactions"] += reactions_count
-                            else:
-                                stats["quote_reactions"][quote] = {"content": quote, "reactions": reactions_count}
-                            save_stats(stats)  # Save updated stats here
+                            stats["quote_reactions"][quote_id] = stats["quote_reactions"].get(quote_id, 0) + reactions_count
+                            schedule_stats_save()   # Batched; the whole fetch is saved once at the end
                     except KeyError as e:
                         logging.exception(f"KeyError updating quote_reactions for quote {quote} during !fetch process. Error: {e}")
                     except OSError as e:
@@ -243,20 +1233,53 @@ async def fetch_message_stats(channel):
         
     # Set the fetch_completed flag to True after processing
     stats["fetch_completed"] = True
-    save_stats(stats)   # Save updated stats here
+    schedule_stats_save()
+    flush_stats()   # Save the whole fetch now rather than after STATS_SAVE_DELAY
         
     # Post confirmation to channel
     await channel.send('Fetched stats from message history.')
 
+# Runs after login, before the gateway connects: start loading data in the background
+@bot.event
+async def setup_hook():
+    log_startup_phase("login")
+
+    # docker stop sends SIGTERM; close the bot cleanly so batched stats and queued writes are flushed on exit
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except (NotImplementedError, RuntimeError):
+        logging.warning("Can't handle SIGTERM on this platform; stats batched at shutdown may be lost.")
+    if FAST_STARTUP:
+        asyncio.create_task(load_data())
+
+_ready_logged = False
+loop_lag_task = None
+
+def start_loop_lag_monitor():
+    global loop_lag_task
+    loop_lag_task = asyncio.create_task(monitor_event_loop_lag())
+
 # Trigger event once bot is connected to Discord to notify server that it is ready
 @bot.event
 @discord_exception_handler
 async def on_ready():
+    global _ready_logged
     logging.info("Logged in as %s", bot.user.name)
     logging.info("%s is ready to receive commands!", bot.user.name)
+    if not _ready_logged:
+        _ready_logged = True
+        log_startup_phase("gateway ready")
 
     if not read_quotes.is_running():
         read_quotes.start()
+    if LOG_STATS_INTERVAL > 0 and not report_logging_costs.is_running():
+        report_logging_costs.start()
+    if QUOTE_RELOAD_INTERVAL > 0 and not watch_quotes_file.is_running():
+        watch_quotes_file.start()
+    if SNAPSHOT_DIR and SNAPSHOT_INTERVAL > 0 and not write_data_snapshot.is_running():
+        write_data_snapshot.start()
+    if loop_lag_task is None or loop_lag_task.done():
+        start_loop_lag_monitor()
 
     guild, channel = get_target_guild_and_channel()
     if not guild or not channel:
@@ -268,12 +1291,15 @@ async def on_ready():
 
     if channel_has_humans(channel):
         logging.info("Humans already present in target voice channel on startup; attempting connect.")
-        ok = await reconnect_voice_client()
+        trace = PlaybackTrace("startup")
+        with trace.span("reconnect"):
+            ok = await reconnect_voice_client()
         if not ok:
             logging.warning("Startup voice connect failed; scheduling retry.")
+            trace.finish("connect failed")
             next_quote_at = time.monotonic() + 15
         else:
-            played = await play_random_quote_once()
+            played = await play_random_quote_once(trace)
             if played:
                 next_quote_at = time.monotonic() + 60
             else:
@@ -326,18 +1352,21 @@ async def on_voice_state_update(member, before, after):
 
         vc = discord.utils.get(bot.voice_clients, guild=guild)
         global next_quote_at
+        trace = PlaybackTrace("member join", member=str(member))
 
         if not vc or not vc.is_connected() or getattr(vc.channel, "id", None) != target_channel_id:
-            ok = await reconnect_voice_client()
+            with trace.span("reconnect"):
+                ok = await reconnect_voice_client()
             if not ok:
                 logging.warning("Immediate voice connect failed on join; scheduling retry.")
+                trace.finish("connect failed")
                 next_quote_at = time.monotonic() + 15
                 return
 
         human_count = sum(1 for m in target_channel.members if not m.bot)
         if human_count == 1:
             logging.info("First human joined target voice channel; playing immediate quote.")
-            played = await play_random_quote_once()
+            played = await play_random_quote_once(trace)
 
             if played:
                 next_quote_at = time.monotonic() + 60
@@ -353,23 +1382,22 @@ async def on_voice_state_update(member, before, after):
               )
               await disconnect_voice_client("channel empty")
 
-# Helper function to check if a file is in use
-def delete_file_with_retry(filepath, retries=5, delay=1):
-    for attempt in range(retries):
-        try:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-            return True
-        except Exception as e:
-            logging.exception(f"Attempt {attempt + 1}: Failed to delete {filepath}. Error: {e}")
-            time.sleep(delay)
-
-    logging.error(f"Failed to delete {filepath} after {retries} attempts.")
-    return False
+# Delete a file once, without retrying: this runs on the disk I/O thread, where sleeping between attempts
+# would hold up queued stats and quote writes. A file left behind (e.g. still held open) is overwritten by
+# the next playback's audio anyway.
+def delete_file(filepath):
+    try:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return True
+    except OSError as e:
+        logging.warning(f"Failed to delete {filepath}; it will be overwritten by the next playback. Error: {e}")
+        return False
 
 # Preprocess quote for gTTS tokenizing
 def preprocess_text(quote):
     try:
+        from gtts.tokenizer import pre_processors    # Imported on first use to keep startup fast
         text = pre_processors.end_of_line(quote)
         text = pre_processors.tone_marks(quote)
         text = pre_processors.abbreviations(quote)
@@ -383,6 +1411,7 @@ def preprocess_text(quote):
 # Tokenize the quote
 def tokenize_text (quote):
     try:
+        from gtts.tokenizer import Tokenizer, tokenizer_cases
         preprocessed_quote = preprocess_text(quote)
         
         # Initialize Tokenizer with symbol rules
@@ -403,59 +1432,41 @@ def tokenize_text (quote):
         logging.exception(f"Error during tokenization: {e}")
         return [quote] # Fallback to returning the original text
 
-# Async wrapper for convert tts to mp3
-async def async_convert_tts_to_mp3(quote):
-    """Asynchronous wrapper for convert_tts_to_mp3."""
-    loop = asyncio.get_event_loop()
+# Convert a quote to quote.mp3: speech is fetched on the TTS pool and encoded in the audio process pool
+async def async_convert_tts_to_mp3(quote, trace=None):
     try:
-        # Use partial to pass arguments to the synchronous function
-        result = await loop.run_in_executor(executor, partial(convert_tts_to_mp3, quote))
-        return result
-    except Exception as e:
-        logging.error(f"Error in async TTS conversion: {e}")
-        return False
-
-# Function to perform TTS conversion using gTTS
-def convert_tts_to_mp3(quote):
-    """Synchronous TTS conversion to MP3"""
-    try:    
-        # Tokenize the input text
-        tokens = tokenize_text(quote)
-        logging.info(f"Tokenized text into {len(tokens)} parts.")
-        
-        # Generate and combine audio for each token
-        combined_audio = None
-        for idx, token in enumerate(tokens):
-            logging.info(f"Processing token {idx + 1}/{len(tokens)}: {token}")
-            tts = gTTS(text=token, lang='en')
-            temp_file = f'temp_token_{idx}.mp3'
-            tts.save(temp_file)
-
-            # Load the audio for the current token
-            audio_segment = AudioSegment.from_file(temp_file)
-
-            # Combine with previous audio
-            if combined_audio is None:
-                combined_audio = audio_segment
-            else:
-                combined_audio += audio_segment
-
-            # Clean up temporary file
-            os.remove(temp_file)
-
-        # Save the combined audio
-        if combined_audio:
-            combined_audio.export("quote.mp3", format="mp3")
-            logging.info("quote.mp3 was created successfully")
-            return True
-        else:
+        with trace.span("tts") if trace else contextlib.nullcontext():
+            segments = await tts_pool.run(synthesize_tts_segments, quote)
+        if not segments:
             logging.error("No audio was generated for the quote.")
             return False
-        
+
+        with trace.span("encode") if trace else contextlib.nullcontext():
+            await audio_pool.run(paulbot_workers.encode_quote_audio, segments, "quote.mp3")
+        logging.info("quote.mp3 was created successfully")
+        return True
+    except ExecutorFull as e:
+        logging.warning(f"Skipping TTS conversion: {e}.")
+        return False
     except Exception as e:
         logging.exception(f"Error converting quote to MP3 file: {e}")
         return False
-        
+
+# Fetch speech for each token of the quote from gTTS, in memory (runs on the TTS pool)
+def synthesize_tts_segments(quote):
+    from gtts import gTTS     # Imported on first use to keep startup fast
+
+    tokens = tokenize_text(quote)
+    logging.info(f"Tokenized text into {len(tokens)} parts.")
+
+    segments = []
+    for idx, token in enumerate(tokens):
+        logging.info(f"Processing token {idx + 1}/{len(tokens)}: {token}")
+        buffer = io.BytesIO()
+        gTTS(text=token, lang='en').write_to_fp(buffer)
+        segments.append(buffer.getvalue())
+    return segments
+
 # Helper to verify Discord server and voice channel for TTS
 def get_target_guild_and_channel():
     try:
@@ -487,7 +1498,69 @@ async def disconnect_voice_client(reason=""):
         logging.exception("Unexpected error in disconnect_voice_client")
         return False
 
-async def play_audio_file(vc, filepath):
+# Playback tracing: one trace per playback attempt, from the trigger (e.g. a member joining) to the first audio frame
+TRACE_BUFFER_SIZE = get_env_int('TRACE_BUFFER_SIZE', 50)
+playback_traces = collections.deque(maxlen=max(1, TRACE_BUFFER_SIZE))   # most recent finished traces
+
+class PlaybackTrace:
+    def __init__(self, trigger, member=None):
+        self.trigger = trigger
+        self.member = member
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.spans = []     # (stage, offset from start in seconds, duration in seconds)
+        self.first_audio = None     # offset of the first audio frame handed to Discord
+        self.outcome = None
+
+    # Time a stage of the playback; spans are recorded even if the stage raises
+    @contextlib.contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((stage, started - self.started, time.perf_counter() - started))
+
+    # Called from the audio player thread when it reads the first frame
+    def mark_first_audio(self):
+        if self.first_audio is None:
+            self.first_audio = time.perf_counter() - self.started
+
+    # Store the trace in the ring buffer; only the first call counts
+    def finish(self, outcome):
+        if self.outcome is not None:
+            return
+        self.outcome = outcome
+        playback_traces.append(self)
+        if self.first_audio is not None:
+            logging.info("Playback trace (%s): first audio after %.0f ms [%s]", self.trigger, self.first_audio * 1000, self.describe_spans())
+
+    def describe_spans(self):
+        return ", ".join(f"{stage} {duration * 1000:.0f} ms" for stage, _, duration in self.spans)
+
+    def to_dict(self):
+        return {
+            "trigger": self.trigger,
+            "member": self.member,
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec='milliseconds'),
+            "outcome": self.outcome,
+            "time_to_first_audio_ms": round(self.first_audio * 1000, 1) if self.first_audio is not None else None,
+            "spans": [{"stage": stage, "offset_ms": round(offset * 1000, 1), "duration_ms": round(duration * 1000, 1)} for stage, offset, duration in self.spans],
+        }
+
+# Nearest-rank percentile of a list of numbers
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+# p50 and p95 time-to-first-audio, in seconds, over the buffered traces
+def time_to_first_audio_percentiles():
+    samples = [trace.first_audio for trace in playback_traces if trace.first_audio is not None]
+    return len(samples), percentile(samples, 0.50), percentile(samples, 0.95)
+
+async def play_audio_file(vc, filepath, trace=None):
     loop = asyncio.get_running_loop()
     finished = asyncio.Event()
     player_error = {"error": None}
@@ -498,7 +1571,20 @@ async def play_audio_file(vc, filepath):
             logging.error("Voice playback thread error: %r", error)
         loop.call_soon_threadsafe(finished.set)
 
-    source = await discord.FFmpegOpusAudio.from_probe(filepath, method="fallback")
+    if trace:
+        with trace.span("probe"):
+            source = await discord.FFmpegOpusAudio.from_probe(filepath, method="fallback")
+
+        # Wrap the source so the player thread marks the trace when it reads the first frame
+        read_frame = source.read
+
+        def read_and_mark():
+            trace.mark_first_audio()
+            return read_frame()
+
+        source.read = read_and_mark
+    else:
+        source = await discord.FFmpegOpusAudio.from_probe(filepath, method="fallback")
     vc.play(source, after=after_playback)
 
     await finished.wait()
@@ -506,7 +1592,17 @@ async def play_audio_file(vc, filepath):
     if player_error["error"] is not None:
         raise player_error["error"]
 
-async def play_random_quote_once():
+# Play one random quote, recording each stage in a playback trace
+async def play_random_quote_once(trace=None):
+    trace = trace or PlaybackTrace("interval")
+    played = False
+    try:
+        played = await _play_random_quote_once(trace)
+        return played
+    finally:
+        trace.finish("played" if played else "not played")
+
+async def _play_random_quote_once(trace):
     global VOICE_FAIL_COUNT, VOICE_FAIL_WINDOW_START
 
     guild, channel = get_target_guild_and_channel()
@@ -525,6 +1621,8 @@ async def play_random_quote_once():
         else:
             VOICE_FAIL_COUNT += 1
 
+    await data_loaded.wait()
+
     async with quote_play_lock:
         # Re-check after acquiring lock
         if not channel_has_humans(channel):
@@ -533,7 +1631,8 @@ async def play_random_quote_once():
 
         if not vc or not vc.is_connected() or getattr(vc.channel, "id", None) != channel.id:
             logging.info("Ensuring voice connection before playback.")
-            ok = await reconnect_voice_client()
+            with trace.span("reconnect"):
+                ok = await reconnect_voice_client()
             if not ok:
                 return False
 
@@ -545,21 +1644,23 @@ async def play_random_quote_once():
             logging.info("Voice client is already playing audio; skipping.")
             return False
 
-        filtered_quotes = [quote for quote in quotes if not contains_url(quote)]
-        if not filtered_quotes:
+        with trace.span("select quote"):
+            filtered_quotes = [(quote_id, quote) for quote_id, quote in zip(quote_ids, quotes) if not contains_url(quote)]
+            quote_id, quote = random.choice(filtered_quotes) if filtered_quotes else (None, None)
+        if quote is None:
             logging.warning("No quotes available for playback.")
             return False
 
-        quote = random.choice(filtered_quotes)
         logging.info("Selected quote to read aloud: %s", quote)
 
-        success = await async_convert_tts_to_mp3(quote)
+        success = await async_convert_tts_to_mp3(quote, trace)
         if not success:
             logging.error("quote.mp3 was not created successfully")
             mark_failure()
             return False
 
-        await asyncio.sleep(0.5)
+        with trace.span("settle"):
+            await asyncio.sleep(0.5)
 
         if not channel_has_humans(channel):
             logging.info("Listeners left before playback started; skipping.")
@@ -572,8 +1673,10 @@ async def play_random_quote_once():
                 return False
 
             logging.info("Starting voice playback in channel '%s'", channel.name)
-            await play_audio_file(vc, "quote.mp3")
+            with trace.span("playback"):
+                await play_audio_file(vc, "quote.mp3", trace)
             logging.info("Voice playback completed successfully.")
+            record_quote_use(quote_id)
             return True
 
         except Exception:
@@ -583,12 +1686,92 @@ async def play_random_quote_once():
 
         finally:
             try:
-                delete_file_with_retry("quote.mp3")
+                await io_pool.run(delete_file, "quote.mp3")
+            except ExecutorFull as e:
+                logging.warning(f"Skipping audio file cleanup: {e}.")
             except Exception:
                 logging.exception("Error cleaning up audio file")
 
+# Pick up edits to quotes.json (by hand on the host, or pulled from git) without restarting
+QUOTE_RELOAD_INTERVAL = get_env_float('QUOTE_RELOAD_INTERVAL', 10)
+
+@tasks.loop(seconds=QUOTE_RELOAD_INTERVAL if QUOTE_RELOAD_INTERVAL > 0 else 10)
+@discord_exception_handler
+async def watch_quotes_file():
+    if not data_loaded.is_set():
+        return
+    quote_id_before_read = next_quote_id
+    try:
+        entries = await io_pool.run(read_changed_quotes)
+    except ExecutorFull:
+        return      # Disk I/O is backed up; check again next time
+    if entries is None:
+        return
+
+    # Quotes added (!addquote, !importquotes) while the file was being read aren't in what was read; applying
+    # it would treat them as removed. Their save rewrites the file, so forget the read and check again later.
+    if next_quote_id != quote_id_before_read or quotes_file in pending_file_writes:
+        known_file_signatures.pop(quotes_file, None)
+        logging.info("Quotes changed while '%s' was being reloaded; retrying on the next check.", quotes_file)
+        return
+    apply_quote_file_changes(entries)
+
+# Point-in-time snapshots of quotes and stats for paulbot_sync.sh to commit. Both are serialized in the same
+# step and written atomically, so a commit never captures a half-written file or quotes and stats from different moments.
+SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots').strip()   # empty disables snapshots
+SNAPSHOT_INTERVAL = get_env_float('SNAPSHOT_INTERVAL', 60)
+last_snapshot = {}  # file name -> text of the last snapshot written
+
+def snapshot_texts():
+    return {
+        os.path.basename(quotes_file): format_quote_records(list(zip(quote_ids, quotes))),
+        os.path.basename(stats_file): json.dumps(stats, indent=4),
+    }
+
+def write_snapshot_files(texts):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    for name, text in texts.items():
+        write_file_atomically(os.path.join(SNAPSHOT_DIR, name), text)
+
+@tasks.loop(seconds=SNAPSHOT_INTERVAL if SNAPSHOT_INTERVAL > 0 else 60)
+@discord_exception_handler
+async def write_data_snapshot():
+    if not data_loaded.is_set():
+        return
+    texts = snapshot_texts()
+    if texts == last_snapshot:
+        return      # Nothing changed since the last snapshot
+    try:
+        await io_pool.run(write_snapshot_files, texts)
+        last_snapshot.update(texts)
+    except ExecutorFull:
+        logging.warning("Disk I/O queue is full; skipping this data snapshot.")
+    except Exception as e:
+        logging.exception(f"Unexpected error writing data snapshot to '{SNAPSHOT_DIR}'. Error: {e}.")
+
+# Periodically log how much logging itself costs, so the effect of debug logging can be measured,
+# along with queue depth and wait times for the worker pools
+LOG_STATS_INTERVAL = get_env_float('LOG_STATS_INTERVAL', 300)
+
+@tasks.loop(seconds=LOG_STATS_INTERVAL if LOG_STATS_INTERVAL > 0 else 300)
+@discord_exception_handler
+async def report_logging_costs():
+    costs = logging_costs.snapshot()
+    enqueue_avg_us = costs["enqueue_seconds"] / costs["enqueued"] * 1e6 if costs["enqueued"] else 0.0
+    write_avg_us = costs["write_seconds"] / costs["written"] * 1e6 if costs["written"] else 0.0
+    logging.info(
+        "Logging cost over last %ss: %s records queued (avg %.1f us, total %.1f ms on calling threads), "
+        "%s written by listener (avg %.1f us, total %.1f ms), %s dropped (queue full), %s debug records sampled out, queue depth %s",
+        int(LOG_STATS_INTERVAL), costs["enqueued"], enqueue_avg_us, costs["enqueue_seconds"] * 1000,
+        costs["written"], write_avg_us, costs["write_seconds"] * 1000,
+        costs["dropped"], costs["sampled_out"], log_listener.queue.qsize() if log_listener else 0
+    )
+    for pool in worker_pools:
+        pool.log_metrics(LOG_STATS_INTERVAL)
+
 # Task to read quotes at intervals
 @tasks.loop(seconds=5)
+@discord_exception_handler
 async def read_quotes():
     global next_quote_at
 
@@ -724,15 +1907,81 @@ async def reconnect_voice_client():
             _next_connect_allowed_ts = loop.time() + CONNECT_COOLDOWN
             return False
             
+# Send a !paul quote, or merge it into the channel's pending reply if the user or channel is over its rate limit
+async def send_paul_quote(message, quote_id):
+    channel = message.channel
+    user_bucket = get_bucket(paul_user_buckets, message.author.id, PAUL_USER_RATE, PAUL_USER_BURST)
+    channel_bucket = get_bucket(paul_channel_buckets, channel.id, PAUL_CHANNEL_RATE, PAUL_CHANNEL_BURST)
+
+    user_ok = user_bucket is None or user_bucket.consume()
+    if user_ok and channel.id not in pending_paul_replies and (channel_bucket is None or channel_bucket.consume()):
+        sent_message = await channel.send(quotes_by_id[quote_id])
+        record_quote_use(quote_id)
+        remember_quote_message(sent_message.id, quote_id)
+        return sent_message
+
+    stats["throttled_paul_requests"] = stats.get("throttled_paul_requests", 0) + 1
+    schedule_stats_save()
+
+    pending = pending_paul_replies.setdefault(channel.id, [])
+    if len(pending) >= PAUL_COALESCE_MAX:
+        logging.info("Dropping throttled !paul request from '%s' in channel %s; merged reply is full.", message.author, channel.id)
+        return None
+
+    pending.append(quote_id)
+    logging.info("Throttled !paul request from '%s' in channel %s; merging into pending reply (%s queued).", message.author, channel.id, len(pending))
+    if channel.id not in paul_flush_tasks:
+        paul_flush_tasks[channel.id] = asyncio.create_task(flush_paul_replies(channel))
+    return None
+
+# Send the merged reply for a channel once the coalesce window has passed and the channel has a free token
+@discord_exception_handler
+async def flush_paul_replies(channel):
+    try:
+        await asyncio.sleep(PAUL_COALESCE_WINDOW)
+        channel_bucket = get_bucket(paul_channel_buckets, channel.id, PAUL_CHANNEL_RATE, PAUL_CHANNEL_BURST)
+        while channel_bucket is not None and not channel_bucket.consume():
+            await asyncio.sleep(channel_bucket.delay_until_available())
+
+        # Take the batch before awaiting so requests arriving during the send start a new one
+        batch = pending_paul_replies.pop(channel.id, [])
+        paul_flush_tasks.pop(channel.id, None)
+
+        # Respect Discord's message length limit; an oversized batch goes out as several messages
+        # A merged message is attributed to its first quote for reaction tracking
+        chunk, chunk_quote_id = "", None
+        for quote_id in batch:
+            quote = quotes_by_id.get(quote_id)
+            if quote is None:
+                continue    # Quote was removed while the reply was pending
+            candidate = f"{chunk}\n\n{quote}" if chunk else quote
+            if chunk and len(candidate) > DISCORD_MESSAGE_LIMIT:
+                sent_message = await channel.send(chunk)
+                remember_quote_message(sent_message.id, chunk_quote_id)
+                candidate, chunk_quote_id = quote, None
+            chunk = candidate
+            chunk_quote_id = quote_id if chunk_quote_id is None else chunk_quote_id
+            record_quote_use(quote_id)
+        if chunk:
+            sent_message = await channel.send(chunk)
+            remember_quote_message(sent_message.id, chunk_quote_id)
+        logging.info("Sent merged !paul reply with %s quote(s) to channel %s.", len(batch), channel.id)
+    except Exception:
+        pending_paul_replies.pop(channel.id, None)
+        paul_flush_tasks.pop(channel.id, None)
+        logging.exception(f"Unexpected error sending merged !paul reply to channel {channel.id}")
+
 # Trigger events based on commands typed in Discord messages
 @bot.event
 @discord_exception_handler
 async def on_message(message):
-    logging.info(f"Received message: '{message.content}' from user: '{message.author}'")
+    logging.debug(f"Received message: '{message.content}' from user: '{message.author}'")
         
     if message.author == bot.user:
         return  #ignore messages that this generates
 
+    await data_loaded.wait()    # Quotes and stats load in the background during fast startup
+
     # Convert the message content to lowercase for processing
     content = message.content.lower()
 
@@ -757,12 +2006,93 @@ async def on_message(message):
         else:
             await message.channel.send('Please provide a quote.')
 
+    # Import quotes in bulk from uploaded text or JSON-lines attachments
+    elif content.startswith('!importquotes'):
+        if not is_admin(message.author):
+            await message.channel.send('Only server administrators can import quotes.')
+            return
+        if not message.attachments:
+            await message.channel.send('Please attach a text file (one quote per line) or a JSON-lines file.')
+            return
+
+        known = {quote_dedupe_key(quote) for quote in quotes}
+        new_quotes = []
+        duplicates = 0
+        invalid = 0
+        for attachment in message.attachments:
+            if attachment.size > IMPORT_MAX_BYTES:
+                logging.warning("Skipping import attachment '%s': %s bytes exceeds the %s byte limit.", attachment.filename, attachment.size, IMPORT_MAX_BYTES)
+                await message.channel.send(f"Skipped '{attachment.filename}': file is larger than {IMPORT_MAX_BYTES} bytes.")
+                continue
+
+            json_mode = attachment.filename.lower().endswith(('.json', '.jsonl', '.ndjson'))
+            try:
+                async for line in stream_attachment_lines(attachment):
+                    try:
+                        parsed = parse_import_line(line, json_mode)
+                    except ValueError:     # json.JSONDecodeError is a ValueError
+                        invalid += 1
+                        continue
+                    for quote in parsed:
+                        key = quote_dedupe_key(quote)
+                        if len(quote) > DISCORD_MESSAGE_LIMIT:
+                            invalid += 1
+                        elif key in known:
+                            duplicates += 1
+                        else:
+                            known.add(key)
+                            new_quotes.append(quote)
+            except (aiohttp.ClientError, ValueError) as e:
+                logging.exception(f"Error downloading import attachment '{attachment.filename}'. Error: {e}")
+                await message.channel.send(f"Failed to read '{attachment.filename}'; nothing from it was imported.")
+                return
+
+        # Quotes may have been added (e.g. by another import) while the attachments downloaded; check again
+        # with no await before add_quotes, so no other handler can slip in between
+        current = {quote_dedupe_key(quote) for quote in quotes}
+        fresh_quotes = [quote for quote in new_quotes if quote_dedupe_key(quote) not in current]
+        duplicates += len(new_quotes) - len(fresh_quotes)
+        new_quotes = fresh_quotes
+
+        try:
+            if new_quotes:
+                add_quotes(new_quotes)
+            logging.info("Imported %s quote(s); skipped %s duplicate(s) and %s invalid line(s).", len(new_quotes), duplicates, invalid)
+            await message.channel.send(f"Imported {len(new_quotes)} quote(s). Skipped {duplicates} duplicate(s) and {invalid} invalid line(s).")
+        except Exception as e:
+            logging.exception(f"Unexpected error importing {len(new_quotes)} quotes. Error: {e}")
+            await message.channel.send('Failed to import quotes due to an unexpected error.')
+
+    # Search the quotes for every given term
+    elif content.startswith('!search'):
+        terms = message.content[len('!search'):].strip()
+        if terms:
+            try:
+                started = time.perf_counter()
+                results = quote_index.search(terms)
+                logging.debug("Search for '%s' matched %s quote(s) in %.3f ms", terms, len(results), (time.perf_counter() - started) * 1000)
+                if results:
+                    lines = [f"Top {len(results)} quote(s) matching '{terms}':"]
+                    for quote_id in results:
+                        line = f"- {quotes_by_id[quote_id]}"
+                        if len("\n".join(lines)) + len(line) + 1 > DISCORD_MESSAGE_LIMIT:
+                            break
+                        lines.append(line)
+                    await message.channel.send("\n".join(lines), allowed_mentions=discord.AllowedMentions.none())   # Echoes user input; never ping
+                else:
+                    await message.channel.send(f"No quotes matched '{terms}'.", allowed_mentions=discord.AllowedMentions.none())
+            except Exception as e:
+                logging.exception(f"Unexpected error searching quotes for: {terms}. Error: {e}")
+                await message.channel.send('Failed to search quotes due to an unexpected error.')
+        else:
+            await message.channel.send('Please provide search terms.')
+
     # Generate and send a random quote to the Discord channel
     elif '!paul' in content:
         user_id = str(message.author.id)
         try:
             stats["paul_commands"][user_id] = stats["paul_commands"].get(user_id, 0) + 1
-            save_stats(stats)   # Save updated stats here
+            schedule_stats_save()   # Batched so a burst of !paul writes stats.json once
         except KeyError as e:
             logging.exception(f"KeyError updating stats for user: {user_id} during !paul command processing. Error: {e}")
         except OSError as e:
@@ -772,8 +2102,7 @@ async def on_message(message):
     
         if quotes:
             try:
-                random_quote = random.choice(quotes)
-                sent_message = await message.channel.send(random_quote)
+                await send_paul_quote(message, random.choice(quote_ids))
             except Exception as e:
                 logging.exception(f"Unexpected error sending random quote: {e}")
                 await message.channel.send('Failed to send random quote due to an unexpected error.')
@@ -796,9 +2125,9 @@ async def on_message(message):
                 top_user_mention = "None"
             # The quote that has had the most reactions in the channel
             if stats["quote_reactions"]:
-                top_quote_id = max(stats["quote_reactions"], key=lambda k: stats["quote_reactions"][k]["reactions"])
-                top_quote = stats["quote_reactions"][top_quote_id]["content"]
-                most_reactions = stats["quote_reactions"][top_quote_id]["reactions"]
+                top_quote_id = max(stats["quote_reactions"], key=stats["quote_reactions"].get)
+                top_quote = quotes_by_id.get(top_quote_id, "(quote has been removed)")
+                most_reactions = stats["quote_reactions"][top_quote_id]
             else:
                 top_quote = None
                 most_reactions = 0
@@ -835,6 +2164,48 @@ async def on_message(message):
             logging.exception(f"Error fetching message stats for channel: {message.channel.id}. Error: {e}")
             await message.channel.send('Failed to fetch message stats.')
         
+    # Admin: sample every thread's stack for N seconds and write a profile file
+    elif content.startswith('!profile'):
+        if not is_admin(message.author):
+            await message.channel.send('Only server administrators can run the profiler.')
+            return
+        if active_profiler is not None and active_profiler.is_alive():
+            await message.channel.send('A profile is already being recorded.')
+            return
+        argument = message.content[len('!profile'):].strip()
+        try:
+            duration = int(argument) if argument else 30
+        except ValueError:
+            await message.channel.send('Usage: !profile <seconds>')
+            return
+        duration = max(1, min(duration, PROFILE_MAX_SECONDS))
+        logging.info("Sampling profiler requested by '%s' for %ss", message.author, duration)
+        await message.channel.send(f"Profiling for {duration}s...")
+        asyncio.create_task(record_profile(message.channel, duration))
+
+    # Admin: show recent playback traces and time-to-first-audio percentiles, or dump them as JSON
+    elif content.startswith('!traces'):
+        if not is_admin(message.author):
+            await message.channel.send('Only server administrators can view playback traces.')
+            return
+        if content[len('!traces'):].strip() == 'json':
+            dump = json.dumps([trace.to_dict() for trace in playback_traces], indent=4)
+            await message.channel.send(file=discord.File(io.BytesIO(dump.encode('utf-8')), filename='playback_traces.json'))
+            return
+
+        count, p50, p95 = time_to_first_audio_percentiles()
+        if count:
+            lines = [f"Time to first audio over {count} playback(s): p50 {p50:.2f}s, p95 {p95:.2f}s"]
+        else:
+            lines = ["No playbacks have reached the first audio frame yet."]
+        for trace in list(playback_traces)[-5:]:
+            first_audio = f"{trace.first_audio:.2f}s" if trace.first_audio is not None else "n/a"
+            line = f"- {datetime.fromtimestamp(trace.started_at):%H:%M:%S} {trace.trigger}, {trace.outcome}, first audio {first_audio}: {trace.describe_spans() or 'no stages'}"
+            if len("\n".join(lines)) + len(line) + 1 > DISCORD_MESSAGE_LIMIT:
+                break
+            lines.append(line)
+        await message.channel.send("\n".join(lines))
+
     # Display a list of available commands to the end user in Discord
     elif '!help' in content:
         try:
@@ -843,9 +2214,13 @@ async def on_message(message):
                 ("!test", "Test command - displays a test message."),
                 ("!addquote <quote>", "Add a quote to the list of quotes."),
                 ("!paul", "Display a random quote from the list of quotes."),
+                ("!importquotes", "(Admin) Import quotes from an attached text (one per line) or JSON-lines file."),
+                ("!search <terms>", "Find the quotes that best match all of the given terms."),
                 ("!stats", "Display statistics for PaulBot."),
                 ("!help", "Display this message."),
-                ("!fetch", "Scan through messages to update stats.")
+                ("!fetch", "Scan through messages to update stats."),
+                ("!traces [json]", "(Admin) Show recent voice playback traces and time-to-first-audio, or download them as JSON."),
+                ("!profile <seconds>", "(Admin) Record a sampling profile of the bot and save it to a file.")
             ]
 
             # Format the list of commands
@@ -863,74 +2238,112 @@ async def on_message(message):
             logging.exception(f"Unexpected error sending help message: {e}.")
             await message.channel.send('Failed to send help message due to an unexpected error.')
 
-# Collect reaction statistics
+# At most this many message fetches run at once to resolve reactions on unknown messages
+REACTION_FETCH_CONCURRENCY = get_env_int('REACTION_FETCH_CONCURRENCY', 2)
+reaction_fetch_semaphore = asyncio.Semaphore(max(1, REACTION_FETCH_CONCURRENCY))
+# Messages known not to hold a quote, so repeated reactions on them don't trigger fetches
+non_quote_messages = collections.OrderedDict()  # message ID -> None, oldest first
+NON_QUOTE_MESSAGE_LIMIT = 1000
+pending_quote_lookups = {}  # message ID -> task fetching that message, shared by concurrent reactions
+
+# Fetch a message that isn't in the lookup yet and work out which quote (if any) it holds
+async def fetch_quote_for_message(channel_id, message_id):
+    async with reaction_fetch_semaphore:
+        channel = bot.get_channel(channel_id) or await bot.fetch_channel(channel_id)
+        message = await channel.fetch_message(message_id)
+
+    return classify_quote_message(message)
+
+# Remember whether a message holds a quote, so later reactions on it need no lookup
+def remember_non_quote_message(message_id):
+    non_quote_messages[message_id] = None
+    if len(non_quote_messages) > NON_QUOTE_MESSAGE_LIMIT:
+        non_quote_messages.popitem(last=False)
+
+def classify_quote_message(message):
+    quote_id = find_quote_in_message(message.content) if message.author == bot.user else None
+    if quote_id is None:
+        remember_non_quote_message(message.id)
+    else:
+        remember_quote_message(message.id, quote_id)
+    return quote_id
+
+# Resolve the quote a reacted-to message holds: the persistent lookup answers the common case without a REST call
+async def resolve_reaction_quote(payload):
+    quote_id = quote_messages.get(payload.message_id)
+    if quote_id is not None or payload.message_id in non_quote_messages:
+        return quote_id
+
+    # Then discord.py's message cache, which covers recent messages (removal events don't say who wrote the message)
+    cached = bot._connection._get_message(payload.message_id)
+    if cached is not None:
+        return classify_quote_message(cached)
+
+    lookup = pending_quote_lookups.get(payload.message_id)
+    if lookup is None:
+        lookup = asyncio.create_task(fetch_quote_for_message(payload.channel_id, payload.message_id))
+        pending_quote_lookups[payload.message_id] = lookup
+        lookup.add_done_callback(lambda _: pending_quote_lookups.pop(payload.message_id, None))
+    return await lookup
+
+# Collect reaction statistics (raw events fire even when the message isn't in the message cache)
 @bot.event
-async def on_reaction_add(reaction, user):
+@discord_exception_handler
+async def on_raw_reaction_add(payload):
     try:
-        if user == bot.user:
+        if bot.user is not None and payload.user_id == bot.user.id:
             return      # Ignore reactions that PaulBot generates
+        if bot.user is not None and payload.message_author_id is not None and payload.message_author_id != bot.user.id:
+            remember_non_quote_message(payload.message_id)   # Someone else's message; a later removal needs no fetch either
+            return
     
-        message = reaction.message
-        content = message.content.lower()
-    
-        if message.author == bot.user:
-            for quote in quotes:
-                if quote.lower() in content:
-                    if quote in stats["quote_reactions"]:
-                        stats["quote_reactions"][quote]["reactions"] += 1
-                    else:
-                        stats["quote_reactions"][quote] = {"content": quote, "reactions": 1}
-                    save_stats(stats) # Save stats here
-                    break   # Stop checking quotes once a match is found
-    except discord.HTTPException as e:
-        logging.exception(f"HTTPException: Error processing reaction addition for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        await data_loaded.wait()
+        quote_id = await resolve_reaction_quote(payload)
+        if quote_id is not None and quote_id in quotes_by_id:
+            stats["quote_reactions"][quote_id] = stats["quote_reactions"].get(quote_id, 0) + 1
+            schedule_stats_save()   # Batched with other stats changes
+    except discord.NotFound as e:
+        logging.warning(f"NotFound: Message ID {payload.message_id} was deleted before its reaction by user ID {payload.user_id} could be processed. Error: {e}.")
     except discord.Forbidden as e:
-        logging.exception(f"Forbidden: Insufficient permissions to process reaction addition for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        logging.exception(f"Forbidden: Insufficient permissions to fetch message ID {payload.message_id} for reaction addition by user ID {payload.user_id}. Error: {e}.")
+    except discord.HTTPException as e:
+        logging.exception(f"HTTPException: Error processing reaction addition for message ID {payload.message_id} by user ID {payload.user_id}. Error: {e}.")
     except KeyError as e:
-        logging.exception(f"KeyError: Attempted to access a non-existent key while processing reaction addition for message ID {message.id} by user ID {user.id}. Key: {e}.")
-    except TypeError as e:
-        logging.exception(f"TypeError: Encountered a type error while processing reaction addition for message ID {message.id} by user ID {user.id}. Error: {e}.")
-    except OSError as e:
-        logging.exception(f"OSError: Failed to save stats while processing reaction addition for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        logging.exception(f"KeyError: Attempted to access a non-existent key while processing reaction addition for message ID {payload.message_id} by user ID {payload.user_id}. Key: {e}.")
     except Exception as e:
-        logging.exception(f"Unexpected error processing reaction addition for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        logging.exception(f"Unexpected error processing reaction addition for message ID {payload.message_id} by user ID {payload.user_id}. Error: {e}.")
         
 # Remove reaction statistics
 @bot.event
-async def on_reaction_remove(reaction, user):
+@discord_exception_handler
+async def on_raw_reaction_remove(payload):
     try:
-        if user == bot.user:
+        if bot.user is not None and payload.user_id == bot.user.id:
             return      # Ignore reactions that PaulBot generates
     
-        message = reaction.message
-        content = message.content.lower()
-    
-        if message.author == bot.user:
-            for quote in quotes:
-                if quote.lower() in content:
-                    if quote in stats["quote_reactions"] and stats["quote_reactions"][quote]["reactions"] > 0:
-                        stats["quote_reactions"][quote]["reactions"] -= 1
-                        if stats["quote_reactions"][quote]["reactions"] == 0:
-                            del stats["quote_reactions"][quote]
-                        save_stats(stats)   #Save stats here
-                    break   # Stop checking quotes once a match is found
-    except discord.HTTPException as e:
-        logging.exception(f"HTTPException: Error processing reaction removal for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        await data_loaded.wait()
+        quote_id = await resolve_reaction_quote(payload)
+        if quote_id is not None and stats["quote_reactions"].get(quote_id, 0) > 0:
+            stats["quote_reactions"][quote_id] -= 1
+            if stats["quote_reactions"][quote_id] == 0:
+                del stats["quote_reactions"][quote_id]
+            schedule_stats_save()   # Batched with other stats changes
+    except discord.NotFound as e:
+        logging.warning(f"NotFound: Message ID {payload.message_id} was deleted before its reaction removal by user ID {payload.user_id} could be processed. Error: {e}.")
     except discord.Forbidden as e:
-        logging.exception(f"Forbidden: Insufficient permissions to process reaction removal for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        logging.exception(f"Forbidden: Insufficient permissions to fetch message ID {payload.message_id} for reaction removal by user ID {payload.user_id}. Error: {e}.")
+    except discord.HTTPException as e:
+        logging.exception(f"HTTPException: Error processing reaction removal for message ID {payload.message_id} by user ID {payload.user_id}. Error: {e}.")
     except KeyError as e:
-        logging.exception(f"KeyError: Attempted to access a non-existent key while processing reaction removal for message ID {message.id} by user ID {user.id}. Key: {e}.")
-    except TypeError as e:
-        logging.exception(f"TypeError: Encountered a type error while processing reaction removal for message ID {message.id} by user ID {user.id}. Error: {e}.")
-    except OSError as e:
-        logging.exception(f"OSError: Failed to save stats while processing reaction removal for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        logging.exception(f"KeyError: Attempted to access a non-existent key while processing reaction removal for message ID {payload.message_id} by user ID {payload.user_id}. Key: {e}.")
     except Exception as e:
-        logging.exception(f"Unexpected error processing reaction removal for message ID {message.id} by user ID {user.id}. Error: {e}.")
+        logging.exception(f"Unexpected error processing reaction removal for message ID {payload.message_id} by user ID {payload.user_id}. Error: {e}.")
 
 # Run the Discord bot with the loaded token
 if __name__ == "__main__":      # Ensure that bot is being run directly instead of inside another script  
+    log_startup_phase("configuration")
     try:        
-        bot.run(TOKEN)
+        bot.run(TOKEN, log_handler=None)    # discord.* records go through our log queue, not discord.py's own stderr handler
     except discord.LoginFailure as e:
         logging.exception(f"LoginFailure: Invalid Discord token provided. Error: {e}.")
     except discord.PrivilegedIntentsRequired as e:
@@ -943,3 +2356,13 @@ if __name__ == "__main__":      # Ensure that bot is being run directly instead
         logging.exception(f"ConnectionClosed: Connection to Discord closed unexpectedly. Error code: {e.code}. Error: {e}.")
     except Exception as e:
         logging.exception(f"Unexpected error during bot run. Error: {e}.")
+    finally:
+        shutdown_worker_pools()     # Let queued file writes finish
+        flush_stats()   # Don't lose batched stats changes on shutdown
+        if SNAPSHOT_DIR and data_loaded.is_set():
+            try:
+                texts = snapshot_texts()
+                if texts != last_snapshot:
+                    write_snapshot_files(texts)
+            except Exception as e:
+                logging.exception(f"Unexpected error writing the final data snapshot. Error: {e}.")
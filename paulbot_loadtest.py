@@ -0,0 +1,452 @@
+# PaulBot load test harness
+#
+# Replays a recorded or generated stream of message, reaction and voice-state events into PaulBot's
+# handlers at a controlled rate, using fake Discord objects and a stub voice client (no network).
+# Reports throughput, event loop lag and handler latency percentiles so the saturation point can be found.
+#
+# Examples:
+#   python paulbot_loadtest.py --rate 200 --duration 10
+#   python paulbot_loadtest.py --ramp 50,100,200,400,800 --duration 5
+#   python paulbot_loadtest.py --generate 5000 --save-events events.jsonl
+#   python paulbot_loadtest.py --events events.jsonl --rate 300
+#
+# Event files are JSON lines: {"type": "message", "user": 3, "channel": 1, "content": "!paul"},
+# {"type": "reaction_add" | "reaction_remove", "user": 3, "channel": 1, "message": 1234 | null},
+# {"type": "voice_join" | "voice_leave", "user": 3}. A null reaction message targets a quote PaulBot sent.
+
+import argparse
+import asyncio
+import collections
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+GUILD_ID = 1
+VOICE_CHANNEL_ID = 2
+BOT_USER_ID = 100
+
+# Fake Discord objects: only the attributes PaulBot's handlers use
+class FakePermissions:
+    administrator = False
+
+class FakeUser:
+    def __init__(self, user_id, bot=False):
+        self.id = user_id
+        self.bot = bot
+        self.name = f"user{user_id}"
+        self.guild_permissions = FakePermissions()
+        self.guild = None   # set for guild members
+
+    def __str__(self):
+        return self.name
+
+class FakeMessage:
+    def __init__(self, message_id, content, author, channel):
+        self.id = message_id
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.attachments = []
+        self.reactions = []
+
+class FakeTextChannel:
+    def __init__(self, harness, channel_id):
+        self.harness = harness
+        self.id = channel_id
+        self.name = f"text{channel_id}"
+        self.messages = {}
+
+    async def send(self, content=None, **kwargs):
+        if self.harness.send_latency:
+            await asyncio.sleep(self.harness.send_latency)
+        message = FakeMessage(self.harness.next_snowflake(), content or "", self.harness.bot_user, self)
+        self.messages[message.id] = message
+        self.harness.sent_messages.append(message.id)
+        return message
+
+    async def fetch_message(self, message_id):
+        if self.harness.send_latency:
+            await asyncio.sleep(self.harness.send_latency)
+        message = self.messages.get(message_id)
+        if message is None:
+            message = FakeMessage(message_id, "just chatting", FakeUser(0), self)
+        self.harness.fetches += 1
+        return message
+
+class FakeAudioSource:
+    def read(self):
+        return b''
+
+# Stands in for discord.VoiceClient: playback runs on a timer thread, like discord.py's audio player thread
+class StubVoiceClient:
+    def __init__(self, harness, channel):
+        self.harness = harness
+        self.guild = channel.guild
+        self.channel = channel
+        self.connected = True
+        self.playing = False
+
+    def is_connected(self):
+        return self.connected
+
+    def is_playing(self):
+        return self.playing
+
+    def play(self, source, after=None):
+        self.playing = True
+
+        def finish():
+            source.read()
+            self.playing = False
+            if after:
+                after(None)
+
+        threading.Timer(self.harness.playback_seconds, finish).start()
+
+    def stop(self):
+        self.playing = False
+
+    async def move_to(self, channel):
+        self.channel = channel
+
+    async def disconnect(self, force=False):
+        self.connected = False
+        self.harness.paulbot.bot._connection._voice_clients.pop(self.guild.id, None)
+
+class FakeVoiceChannel:
+    def __init__(self, harness, guild):
+        self.harness = harness
+        self.id = VOICE_CHANNEL_ID
+        self.name = "voice"
+        self.guild = guild
+        self.members = []
+
+    async def connect(self, timeout=60, reconnect=True):
+        voice_client = StubVoiceClient(self.harness, self)
+        self.harness.paulbot.bot._connection._voice_clients[self.guild.id] = voice_client
+        return voice_client
+
+class FakeGuild:
+    def __init__(self, harness):
+        self.id = GUILD_ID
+        self.voice_channel = FakeVoiceChannel(harness, self)
+
+    def get_channel(self, channel_id):
+        return self.voice_channel if channel_id == VOICE_CHANNEL_ID else None
+
+class FakeVoiceState:
+    def __init__(self, channel):
+        self.channel = channel
+
+class FakeReactionPayload:
+    def __init__(self, message_id, channel_id, user_id, message_author_id=None):
+        self.message_id = message_id
+        self.channel_id = channel_id
+        self.user_id = user_id
+        self.message_author_id = message_author_id  # only sent with reaction adds, as with Discord
+
+# Nearest-rank percentile in milliseconds, formatted for the report
+def format_percentiles(samples):
+    if not samples:
+        return "n/a"
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[max(0, min(len(ordered) - 1, int(fraction * len(ordered) + 0.999999) - 1))] * 1000
+    return f"p50 {pick(0.50):7.2f}  p95 {pick(0.95):7.2f}  p99 {pick(0.99):7.2f}  max {ordered[-1] * 1000:7.2f} ms"
+
+# Generate a synthetic event stream with the given mix of event types
+def generate_events(count, users, channels, mix, seed):
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    search_terms = ["flush", "bird", "high", "paul", "sleep", "dog", "the"]
+    in_voice = set()
+    events = []
+    for _ in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        user = rng.randint(1, users)
+        channel = rng.randint(1, channels)
+        if kind == "message":
+            roll = rng.random()
+            if roll < 0.7:
+                content = "!paul"
+            elif roll < 0.8:
+                content = f"!search {rng.choice(search_terms)}"
+            else:
+                content = "lol that's so paul"
+            events.append({"type": "message", "user": user, "channel": channel, "content": content})
+        elif kind == "reaction":
+            # Most reactions land on recent PaulBot quotes; some on messages PaulBot has never seen
+            message = None if rng.random() < 0.9 else rng.randint(10**17, 10**18)
+            action = "reaction_add" if rng.random() < 0.8 else "reaction_remove"
+            events.append({"type": action, "user": user, "channel": channel, "message": message})
+        else:
+            action = "voice_leave" if user in in_voice else "voice_join"
+            (in_voice.discard if action == "voice_leave" else in_voice.add)(user)
+            events.append({"type": action, "user": user})
+    return events
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        mix[kind.strip()] = float(weight)
+    unknown = set(mix) - {"message", "reaction", "voice"}
+    if unknown:
+        raise SystemExit(f"Unknown event type(s) in --mix: {', '.join(sorted(unknown))}")
+    return mix
+
+class Harness:
+    def __init__(self, args, paulbot):
+        self.args = args
+        self.paulbot = paulbot
+        self.send_latency = args.send_latency / 1000
+        self.playback_seconds = args.playback_seconds
+        self.snowflake = int(time.time() * 1000) << 22
+        self.bot_user = FakeUser(BOT_USER_ID, bot=True)
+        self.guild = FakeGuild(self)
+        self.text_channels = {}
+        self.users = {}
+        self.sent_messages = collections.deque(maxlen=500)
+        self.fetches = 0
+
+        bot = paulbot.bot
+        bot._connection.user = self.bot_user
+        bot.get_guild = lambda guild_id: self.guild if guild_id == GUILD_ID else None
+        bot.get_channel = lambda channel_id: self.text_channels.get(channel_id)
+
+        # Replace network-bound voice work: gTTS synthesis and FFmpeg probing
+        async def fake_tts(quote, trace=None):
+            await asyncio.sleep(args.tts_latency / 1000)
+            return True
+
+        async def fake_probe(*_args, **_kwargs):
+            return FakeAudioSource()
+
+        paulbot.async_convert_tts_to_mp3 = fake_tts
+        paulbot.discord.FFmpegOpusAudio.from_probe = fake_probe
+
+    def next_snowflake(self):
+        self.snowflake += 1
+        return self.snowflake
+
+    def text_channel(self, channel_id):
+        if channel_id not in self.text_channels:
+            self.text_channels[channel_id] = FakeTextChannel(self, channel_id)
+        return self.text_channels[channel_id]
+
+    def user(self, user_id):
+        if user_id not in self.users:
+            member = FakeUser(user_id)
+            member.guild = self.guild
+            self.users[user_id] = member
+        return self.users[user_id]
+
+    # Build the coroutine that delivers one event to the matching PaulBot handler
+    def handler_call(self, event):
+        pb = self.paulbot
+        kind = event["type"]
+        user = self.user(event["user"])
+        if kind == "message":
+            channel = self.text_channel(event.get("channel", 1))
+            message = FakeMessage(self.next_snowflake(), event["content"], user, channel)
+            return pb.on_message(message)
+        if kind in ("reaction_add", "reaction_remove"):
+            channel = self.text_channel(event.get("channel", 1))
+            message_id = event.get("message")
+            if message_id is None:
+                message_id = random.choice(self.sent_messages) if self.sent_messages else self.next_snowflake()
+            # Messages not sent by PaulBot in this run were written by someone else
+            author_id = (BOT_USER_ID if message_id in channel.messages else 0) if kind == "reaction_add" else None
+            payload = FakeReactionPayload(message_id, channel.id, user.id, author_id)
+            return (pb.on_raw_reaction_add if kind == "reaction_add" else pb.on_raw_reaction_remove)(payload)
+        if kind in ("voice_join", "voice_leave"):
+            voice_channel = self.guild.voice_channel
+            if kind == "voice_join":
+                if user not in voice_channel.members:
+                    voice_channel.members.append(user)
+                before, after = FakeVoiceState(None), FakeVoiceState(voice_channel)
+            else:
+                if user in voice_channel.members:
+                    voice_channel.members.remove(user)
+                before, after = FakeVoiceState(voice_channel), FakeVoiceState(None)
+            return pb.on_voice_state_update(user, before, after)
+        raise ValueError(f"Unknown event type: {kind}")
+
+    # Feed events at a fixed rate, the way discord.py dispatches: each handler runs as its own task
+    async def run_stage(self, events, rate, duration):
+        loop = asyncio.get_running_loop()
+        latencies = collections.defaultdict(list)
+        loop_lags = []
+        dispatch_lags = []
+        completions = []
+        in_flight = set()
+        stop_probe = asyncio.Event()
+        throttled_before = self.paulbot.stats.get("throttled_paul_requests", 0)
+        fetches_before = self.fetches
+        sent_before = len(self.sent_messages)
+
+        async def probe_loop_lag():
+            interval = 0.01
+            while not stop_probe.is_set():
+                started = loop.time()
+                await asyncio.sleep(interval)
+                loop_lags.append(max(0.0, loop.time() - started - interval))
+
+        async def timed(kind, coro, dispatched):
+            await coro
+            completions.append(loop.time())
+            latencies[kind].append(completions[-1] - dispatched)
+
+        probe = asyncio.create_task(probe_loop_lag())
+        total = int(rate * duration) if duration else len(events)
+        started = loop.time()
+        for index in range(total):
+            scheduled = started + index / rate
+            delay = scheduled - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            now = loop.time()
+            dispatch_lags.append(max(0.0, now - scheduled))
+            event = events[index % len(events)]
+            task = asyncio.create_task(timed(event["type"], self.handler_call(event), now))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+
+        dispatch_finished = loop.time()
+        if in_flight:
+            await asyncio.wait(in_flight, timeout=self.args.drain_timeout)
+        finished = loop.time()
+        stop_probe.set()
+        await probe
+
+        completed = sum(len(samples) for samples in latencies.values())
+        return {
+            "rate": rate,
+            "dispatched": total,
+            "completed": completed,
+            "completed_while_dispatching": sum(1 for finished_at in completions if finished_at <= dispatch_finished),
+            "unfinished": len(in_flight),
+            "dispatch_seconds": dispatch_finished - started,
+            "elapsed": finished - started,
+            "latencies": latencies,
+            "loop_lags": loop_lags,
+            "dispatch_lags": dispatch_lags,
+            "throttled": self.paulbot.stats.get("throttled_paul_requests", 0) - throttled_before,
+            "fetches": self.fetches - fetches_before,
+            "sent": len(self.sent_messages) - sent_before if len(self.sent_messages) < self.sent_messages.maxlen else None,
+        }
+
+def print_stage_report(result):
+    achieved = rate_per_second(result["dispatched"], result["dispatch_seconds"])
+    throughput = rate_per_second(result["completed_while_dispatching"], result["dispatch_seconds"])
+    print(f"\n=== Offered {result['rate']:.0f} events/s ===")
+    print(f"Dispatched {result['dispatched']} events in {result['dispatch_seconds']:.2f}s (achieved {achieved:.1f}/s); "
+          f"throughput {throughput:.1f}/s; all {result['completed']} done after {result['elapsed']:.2f}s, "
+          f"{result['unfinished']} still running at drain timeout")
+    print(f"Event loop lag     {format_percentiles(result['loop_lags'])}")
+    print(f"Dispatch lag       {format_percentiles(result['dispatch_lags'])}")
+    for kind, samples in sorted(result["latencies"].items()):
+        print(f"{kind:<18} {format_percentiles(samples)}  (n={len(samples)})")
+    print(f"!paul requests throttled: {result['throttled']}; message fetches for reactions: {result['fetches']}")
+
+def rate_per_second(count, seconds):
+    return count / seconds if seconds > 0 else float('inf')
+
+# A stage is saturated when the loop can't dispatch at the offered rate, handlers complete slower than they
+# arrive, or the loop falls noticeably behind. Throughput is counted while dispatching, so a voice handler
+# that is still playing a quote at the end of the stage doesn't count against it.
+def is_saturated(result, lag_threshold):
+    achieved = rate_per_second(result["dispatched"], result["dispatch_seconds"])
+    throughput = rate_per_second(result["completed_while_dispatching"], result["dispatch_seconds"])
+    lags = sorted(result["loop_lags"])
+    p95_lag = lags[int(0.95 * (len(lags) - 1))] if lags else 0.0
+    return (result["unfinished"] > 0 or achieved < 0.95 * result["rate"]
+            or throughput < 0.9 * result["rate"] or p95_lag > lag_threshold)
+
+def prepare_environment(args):
+    workdir = tempfile.mkdtemp(prefix="paulbot-loadtest-")
+    for source, name in ((args.quotes, "quotes.json"), (args.stats, "stats.json")):
+        if os.path.exists(source):
+            shutil.copy(source, os.path.join(workdir, name))
+        else:
+            with open(os.path.join(workdir, name), 'w') as file:
+                file.write("[]" if name == "quotes.json" else "{}")
+
+    # PaulBot reads its configuration at import time; work on copies of the data files in a scratch directory
+    os.environ.setdefault('DISCORD_TOKEN', 'loadtest')
+    os.environ['DISCORD_GUILD_ID'] = str(GUILD_ID)
+    os.environ['VOICE_CHANNEL_ID'] = str(VOICE_CHANNEL_ID)
+    os.environ['LOG_FILE_PATH'] = os.path.join(workdir, 'paulbot.log')
+    os.environ['LOG_LEVEL'] = args.log_level
+    os.environ['FAST_STARTUP'] = '1'
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    return workdir
+
+async def main_async(args, events):
+    import PaulBot as paulbot
+    paulbot.apply_loaded_data(paulbot.load_quotes(), paulbot.load_stats())
+    harness = Harness(args, paulbot)
+
+    rates = [float(rate) for rate in args.ramp.split(',')] if args.ramp else [args.rate]
+    saturation = None
+    for rate in rates:
+        result = await harness.run_stage(events, rate, args.duration)
+        print_stage_report(result)
+        if saturation is None and is_saturated(result, args.lag_threshold / 1000):
+            saturation = rate
+
+    if len(rates) > 1:
+        print()
+        print(f"Saturation point: {saturation:.0f} events/s" if saturation else f"No saturation up to {rates[-1]:.0f} events/s")
+    paulbot.flush_stats()
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic Discord events into PaulBot's handlers and measure how they hold up.")
+    parser.add_argument('--events', help="JSON-lines event file to replay (default: generate a stream)")
+    parser.add_argument('--generate', type=int, default=20_000, help="number of events to generate when --events is not given")
+    parser.add_argument('--save-events', help="write the generated event stream to this file and exit")
+    parser.add_argument('--mix', default="message=0.6,reaction=0.38,voice=0.02", help="relative weights of message, reaction and voice events")
+    parser.add_argument('--users', type=int, default=50, help="distinct users in the generated stream")
+    parser.add_argument('--channels', type=int, default=3, help="distinct text channels in the generated stream")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for generation")
+    parser.add_argument('--rate', type=float, default=100, help="events per second to offer")
+    parser.add_argument('--ramp', help="comma-separated rates to run in sequence, reporting the first that saturates")
+    parser.add_argument('--duration', type=float, default=10, help="seconds per stage; events repeat if the stream is shorter (0 replays the stream once)")
+    parser.add_argument('--drain-timeout', type=float, default=30, help="seconds to wait for in-flight handlers after dispatching")
+    parser.add_argument('--lag-threshold', type=float, default=50, help="p95 event loop lag in ms that counts as saturated")
+    parser.add_argument('--send-latency', type=float, default=0, help="simulated Discord REST latency in ms for send/fetch")
+    parser.add_argument('--tts-latency', type=float, default=300, help="simulated gTTS conversion time in ms")
+    parser.add_argument('--playback-seconds', type=float, default=3, help="simulated length of each spoken quote")
+    parser.add_argument('--quotes', default=os.path.join(REPO_DIR, 'quotes.json'), help="quotes file to copy into the scratch directory")
+    parser.add_argument('--stats', default=os.path.join(REPO_DIR, 'stats.json'), help="stats file to copy into the scratch directory")
+    parser.add_argument('--log-level', default='WARNING', help="PaulBot log level during the run")
+    args = parser.parse_args()
+
+    if args.events:
+        with open(args.events, encoding='utf-8') as file:
+            events = [json.loads(line) for line in file if line.strip()]
+    else:
+        events = generate_events(args.generate, args.users, args.channels, parse_mix(args.mix), args.seed)
+    if not events:
+        raise SystemExit("No events to replay.")
+
+    if args.save_events:
+        with open(args.save_events, 'w', encoding='utf-8') as file:
+            for event in events:
+                file.write(json.dumps(event) + "\n")
+        print(f"Wrote {len(events)} events to {args.save_events}")
+        return
+
+    workdir = prepare_environment(args)
+    print(f"Replaying {len(events)} events; scratch data and logs in {workdir}")
+    asyncio.run(main_async(args, events))
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,9 @@ DOCKER_IMAGE="paulbot-image"
 DOCKER_CONTAINER="paulbot"
 RUN_SCRIPT="/etc/paulbot/run_paulbot.sh"
 ENV_FILE="/etc/paulbot/paulbot.env"
+SNAPSHOT_DIR="/etc/paulbot/snapshots"
+DATA_FILES=(quotes.json stats.json)
+BOT_OWNED_FILE="stats.json"    # written only by the bot, which never reloads it
 
 # Load environment variables from .env
 if [[ -f "$ENV_FILE" ]]; then
@@ -41,10 +44,38 @@ git fetch "$GITHUB_URL" "$CURRENT_BRANCH" || { echo "Git fetch failed. Exiting."
 
 REMOTE_HEAD="$(git rev-parse FETCH_HEAD)"
 
+# The container bind-mounts quotes.json and stats.json by inode, but git pull replaces a changed file with
+# a new one, which the running bot would never see. Keep a hard link to each mounted file during the pull,
+# then copy any pulled quotes into it and put it back in place; the bot then reloads the quotes.
+# The bot doesn't reload stats.json, so a pulled stats.json is discarded and the bot's copy is pushed over it.
+keep_mounted_files() {
+    for file in "${DATA_FILES[@]}"; do
+        [[ -f "$file" ]] && ln -f "$file" ".$file.live"
+    done
+    # Reset the bot's uncommitted stats so they can't block the pull; git replaces the file, so the linked copy keeps them
+    [[ -f ".$BOT_OWNED_FILE.live" ]] && git checkout -q -- "$BOT_OWNED_FILE" 2>/dev/null
+}
+
+restore_mounted_files() {
+    for file in "${DATA_FILES[@]}"; do
+        [[ -f ".$file.live" ]] || continue
+        if [[ "$file" == "$BOT_OWNED_FILE" && ! "$file" -ef ".$file.live" ]]; then
+            mv -f ".$file.live" "$file"
+        elif [[ -f "$file" && ! "$file" -ef ".$file.live" ]]; then
+            cat "$file" > ".$file.live"
+            mv -f ".$file.live" "$file"
+        else
+            rm -f ".$file.live"
+        fi
+    done
+}
+
 # Pull only if remote HEAD differs from local HEAD
 if [[ "$OLD_HEAD" != "$REMOTE_HEAD" ]]; then
     echo "Changes detected in remote repository. Pulling updates..."
-    git pull --ff-only "$GITHUB_URL" "$CURRENT_BRANCH" || { echo "Git pull failed. Exiting."; exit 1; }
+    keep_mounted_files
+    git pull --ff-only "$GITHUB_URL" "$CURRENT_BRANCH" || { restore_mounted_files; echo "Git pull failed. Exiting."; exit 1; }
+    restore_mounted_files
     NEW_HEAD="$(git rev-parse HEAD)"
 else
     echo "Repository is already up-to-date. No pull needed."
@@ -53,7 +84,7 @@ fi
 
 # Inspect pulled changes for core files
 echo "Checking for changes in core files..."
-if [[ "$OLD_HEAD" != "$NEW_HEAD" ]] && git diff --name-only "$OLD_HEAD" "$NEW_HEAD" | grep -qE '(^|/)(Paulbot\.py|requirements\.txt)$'; then
+if [[ "$OLD_HEAD" != "$NEW_HEAD" ]] && git diff --name-only "$OLD_HEAD" "$NEW_HEAD" | grep -qE '(^|/)(PaulBot\.py|paulbot_workers\.py|requirements\.txt)$'; then
     echo "Changes detected in core files. Restarting Docker container..."
 
     docker ps -aq --filter "name=$DOCKER_CONTAINER" | xargs -r docker rm -f || echo "No matching container to remove."
@@ -64,9 +95,24 @@ else
     echo "No changes detected in core files. Skipping container rebuild."
 fi
 
-# Add and commit changes (e.g., updated quotes.json or stats.json)
+# Add and commit changes (e.g., updated quotes.json or stats.json). The bot's snapshots are staged in place
+# of the live files, which may be mid-rewrite; the live files are only used if there is no snapshot.
 echo "Checking for changes to commit to GitHub..."
-git add quotes.json stats.json || echo "No changes to add."
+# A quotes.json this run pulled is skipped: its snapshot predates the pull and would revert the upstream change.
+# The bot reloads the pulled file and snapshots it before the next sync. stats.json is always committed.
+PULLED_FILES=""
+if [[ "$OLD_HEAD" != "$NEW_HEAD" ]]; then
+    PULLED_FILES="$(git diff --name-only "$OLD_HEAD" "$NEW_HEAD")"
+fi
+for file in "${DATA_FILES[@]}"; do
+    if [[ "$file" != "$BOT_OWNED_FILE" ]] && grep -qxF "$file" <<< "$PULLED_FILES"; then
+        echo "$file was updated by this pull; not committing it this run."
+    elif [[ -s "$SNAPSHOT_DIR/$file" ]]; then
+        BLOB="$(git hash-object -w "$SNAPSHOT_DIR/$file")" && git update-index --cacheinfo "100644,$BLOB,$file" || echo "Failed to stage snapshot of $file."
+    else
+        git add "$file" || echo "No changes to add for $file."
+    fi
+done
 if ! git diff --cached --quiet; then
     git commit -m "Automated sync at $(date)" || { echo "Failed to commit changes."; exit 1; }
     git push "$GITHUB_URL" || { echo "Git push failed"; exit 1; }
@@ -0,0 +1,35 @@
+# Code that runs in PaulBot's worker pools. The audio pool's processes import this module rather than
+# PaulBot.py, so they don't repeat the bot's startup (logging, Discord client, data load).
+import io
+import logging
+import time
+
+
+# Runs in the worker. Returns the wall-clock start time (comparable across processes) so queue wait can be
+# measured, and returns errors instead of raising so the start time is known for failed jobs too.
+def run_timed(func, args):
+    started_at = time.time()
+    try:
+        return started_at, True, func(*args)
+    except Exception as e:
+        return started_at, False, e
+
+# Audio workers can't reach the bot's log listener thread, so send anything they log straight to stderr
+# (the container log)
+def init_audio_worker():
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(process)d] %(message)s', '%Y-%m-%d %H:%M:%S'))
+    root_logger.addHandler(handler)
+
+# Join the MP3 segments into one file (errors are raised to the caller to log)
+def encode_quote_audio(segments, output_path):
+    from pydub import AudioSegment
+
+    combined_audio = None
+    for segment in segments:
+        audio_segment = AudioSegment.from_file(io.BytesIO(segment), format="mp3")
+        combined_audio = audio_segment if combined_audio is None else combined_audio + audio_segment
+    combined_audio.export(output_path, format="mp3")
@@ -11,14 +11,16 @@ CONTAINER_NAME="paulbot"
 ENV_FILE="/etc/paulbot/paulbot.env"
 QUOTES_FILE="/etc/paulbot/quotes.json"
 STATS_FILE="/etc/paulbot/stats.json"
+SNAPSHOT_DIR="/etc/paulbot/snapshots"	# Atomic copies of quotes/stats for paulbot_sync.sh to commit
 LOG_DIR="/var/log/paulbot"
+DATA_DIR="/var/lib/paulbot"	# Internal bot state that isn't synced to git
 
 # Per-container Docker log rotation
 LOG_MAX_SIZE="${LOG_MAX_SIZE:-50m}"
 LOG_MAX_FILE="${LOG_MAX_FILE:-3}"
 
 # Prep host paths
-mkdir -p "$(dirname "$ENV_FILE")" "$(dirname "$QUOTES_FILE")" "$(dirname "$STATS_FILE")" "$LOG_DIR"
+mkdir -p "$(dirname "$ENV_FILE")" "$(dirname "$QUOTES_FILE")" "$(dirname "$STATS_FILE")" "$LOG_DIR" "$SNAPSHOT_DIR" "$DATA_DIR"
 touch "$QUOTES_FILE" "$STATS_FILE"
 
 # Stop and remove existing container (if any)
@@ -34,6 +36,8 @@ docker run -d \
 	-v $ENV_FILE:/app/.env \
 	-v $QUOTES_FILE:/app/quotes.json \
 	-v $STATS_FILE:/app/stats.json \
+	-v $SNAPSHOT_DIR:/app/snapshots \
+	-v $DATA_DIR:/app/data \
 	-v $LOG_DIR:/app/logs \
 	-v /etc/localtime:/etc/localtime:ro \
 	-v /etc/timezone:/etc/timezone:ro \